@@ -0,0 +1,73 @@
+from PIL import Image
+import hashlib
+import os
+import shutil
+from profiling import profiler
+
+
+class AssetCache:
+    """Resample and recompress background images once, cached on disk by content hash."""
+
+    def __init__(self, cache_dir=".leap_cache/assets", dpi=150, quality=85):
+        self.cache_dir = cache_dir
+        self.dpi = dpi
+        self.quality = quality
+        self._prepared = {}
+
+    def _content_hash(self, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def prepare(self, path, width, height):
+        """Return the path of a copy of the image fitted to width x height points."""
+        if not path or not os.path.exists(path):
+            return path
+
+        key = (path, width, height)
+        if key in self._prepared:
+            return self._prepared[key]
+
+        target = (round(width / 72 * self.dpi), round(height / 72 * self.dpi))
+        stem = f"{self._content_hash(path)[:24]}-{target[0]}x{target[1]}-q{self.quality}"
+        for ext in ('.jpg', '.png'):
+            cached = os.path.join(self.cache_dir, stem + ext)
+            if os.path.exists(cached):
+                profiler.count("asset_cache.hits")
+                self._prepared[key] = cached
+                return cached
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        profiler.count("files.read")
+        profiler.count("files.written")
+        with Image.open(path) as image:
+            image.load()
+            source_format = image.format
+            changed = False
+            if image.mode in ('LA', 'RGBA') and image.getextrema()[-1][0] == 255:
+                image = image.convert(image.mode[:-1])
+                changed = True
+
+            if image.width > target[0] or image.height > target[1]:
+                if image.mode == 'P':
+                    image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+                image = image.resize((min(image.width, target[0]), min(image.height, target[1])),
+                                     Image.LANCZOS)
+                changed = True
+
+            lossless = image.mode not in ('RGB', 'L') or image.getcolors(256) is not None
+            image_format = 'PNG' if lossless else 'JPEG'
+            cached = os.path.join(self.cache_dir, stem + ('.png' if lossless else '.jpg'))
+            tmp_path = cached + '.tmp'
+            if not changed and source_format == image_format:
+                shutil.copyfile(path, tmp_path)
+            elif lossless:
+                image.save(tmp_path, 'PNG', optimize=True)
+            else:
+                image.save(tmp_path, 'JPEG', quality=self.quality, optimize=True)
+            os.replace(tmp_path, cached)
+
+        self._prepared[key] = cached
+        return cached
@@ -0,0 +1,253 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from bookManifest import BookManifest
+from chainFile import write_chain, read_chain
+from createBook import SudokuBookCreator, create_sudoku_book
+from exactCover import ExactCoverSudoku
+from generatePuzzle import SudokuGenerator, SolverSudoku, EnhancedSudokuGenerator, createPuzzleSvg, createPuzzleSet
+from gridBatch import GridBatch
+from gridFactory import GridFactory
+from main import BACKGROUND_IMAGES, build_parser, generate_puzzle_sets
+from sudokuGrader import TechniqueGrader
+from sudokuGrid import Grid
+from sudokuSolver import BitmaskSolver
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RESULTS = "benchmark_results.json"
+
+# Share of the default 33-puzzle book (15/10/5/3) that goes to each mode
+MODE_SHARES = (("-e", 15), ("-m", 10), ("-a", 5), ("-g", 3))
+
+
+def make_puzzles(count, n_hints, seed, unique=False):
+    random.seed(seed)
+    factory = GridFactory()
+    return [SudokuGenerator(n_hints, unique, grid_factory=factory).generate_puzzle() for _ in range(count)]
+
+
+def time_per_call(func, inputs, repeat=3):
+    """Average seconds per call of func over inputs, best of repeat rounds to damp noise."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in inputs:
+            func(item)
+        elapsed = (time.perf_counter() - start) / len(inputs)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Results:
+    """Named benchmark metrics; every metric is lower-is-better."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit="s"):
+        self.metrics[name] = {"value": value, "unit": unit}
+        if unit == "s":
+            print(f"{name:<32} {value * 1000:>12.3f} ms")
+        else:
+            print(f"{name:<32} {value:>12,} {unit}")
+
+    def save(self, path, seed):
+        with open(path, 'w') as f:
+            json.dump({
+                "meta": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "seed": seed,
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                },
+                "metrics": self.metrics
+            }, f, indent=1)
+
+
+def bench_micro(results, count, hints_list, seed):
+    """Per-function timings, each on inputs drawn from a fixed seed."""
+    print("\nMicrobenchmarks (per call)")
+    few = max(count // 5, 1)
+
+    random.seed(seed)
+    results.add("fill_grid", time_per_call(lambda _: SudokuGenerator().fill_grid(), range(count)))
+
+    random.seed(seed)
+    factory = GridFactory()
+    results.add("grid_factory.next_grid", time_per_call(lambda _: factory.next_grid(), range(count * 10)))
+    results.add("grid_batch.generate_10k", time_per_call(
+        lambda batch_seed: GridBatch.generate(factory.seed_grids, 10000, batch_seed).solved(), range(3)))
+
+    solutions = [factory.next_grid() for _ in range(count)]
+
+    def dig(solution, n_hints, unique):
+        generator = SudokuGenerator(n_hints, unique)
+        generator.grid = solution
+        generator.remove_numbers()
+
+    random.seed(seed)
+    results.add("remove_numbers.27", time_per_call(lambda grid: dig(grid, 27, False), solutions))
+    random.seed(seed)
+    results.add("dig_unique.24", time_per_call(lambda grid: dig(grid, 24, True), solutions[:few]))
+
+    bitmask = BitmaskSolver()
+    for n_hints in hints_list:
+        results.add(f"solve.bitmask.{n_hints}", time_per_call(bitmask.solve, make_puzzles(count, n_hints, seed)))
+    # The legacy backtracking solver takes seconds per puzzle below ~30 hints
+    legacy = SolverSudoku()
+    puzzles = [puzzle.to_rows() for puzzle in make_puzzles(few, 40, seed)]
+    # Suduko solves in place, so every call gets a fresh copy of the rows
+    results.add("solve.legacy.40", time_per_call(lambda rows: legacy.Suduko([row[:] for row in rows], 0, 0),
+                                                 puzzles))
+
+    grader = TechniqueGrader()
+    results.add("grade.unique.24", time_per_call(grader.grade, make_puzzles(few, 24, seed, True)))
+
+    random.seed(seed)
+    pairs = [(puzzle, factory.next_grid()) for puzzle in make_puzzles(count, 36, seed)]
+    results.add("link_puzzle", time_per_call(
+        lambda pair: EnhancedSudokuGenerator('A', 2, 36, 7).link_puzzle(pair[0], pair[1], pair[1]), pairs))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results.add("createPuzzleSvg", time_per_call(
+            lambda pair: createPuzzleSvg(os.path.join(workdir, "puzzle"), pair[0]), pairs[:few]))
+
+        manifest = BookManifest()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.chdir(workdir):
+            createPuzzleSet('E', 300, 36, 3, seed=seed, grid_factory=factory, manifest=manifest)
+        chain_path = os.path.join(workdir, "chain.leap")
+        results.add("chain.write.300", time_per_call(lambda _: write_chain(chain_path, manifest), range(5)))
+        results.add("chain.read.300", time_per_call(lambda _: read_chain(chain_path), range(5)))
+
+        creator = SudokuBookCreator(os.path.join(workdir, "grids.pdf"), invariant=True)
+        page = canvas.Canvas(os.path.join(workdir, "grids.pdf"), pagesize=A4)
+        results.add("draw_grid", time_per_call(
+            lambda record: creator.draw_grid(page, record.grid, 50, 50, 1), list(manifest)))
+
+
+def bench_sizes(results, count, boxes, seed):
+    """Exact cover fill, solve and solution count for every grid size."""
+    print("\nExact cover engine (per call)")
+    few = max(count // 10, 2)
+    for box in boxes:
+        size = box * box
+        engine = ExactCoverSudoku(box)
+        rng = random.Random(seed)
+        results.add(f"exact_cover.fill.{size}", time_per_call(lambda _: engine.fill(rng), range(few)))
+
+        puzzles = []
+        for _ in range(few):
+            cells = engine.fill(rng).mutable()
+            for index in rng.sample(range(size * size), size * size * 2 // 5):
+                cells[index] = 0
+            puzzles.append(Grid(cells, size))
+        results.add(f"exact_cover.solve.{size}", time_per_call(engine.solve, puzzles))
+        results.add(f"exact_cover.count.{size}", time_per_call(engine.count_solutions, puzzles))
+
+
+def book_arguments(total, seed):
+    """main.py arguments for a book of total puzzles split like the default book."""
+    counts = [max(total * share // 33, 1) for _, share in MODE_SHARES]
+    counts[0] += total - sum(counts)
+    arguments = ["-s", str(seed)]
+    for (flag, _), count in zip(MODE_SHARES, counts):
+        arguments += [flag, str(count)]
+    return arguments
+
+
+def bench_books(results, sizes, seed):
+    """Generate and render whole books, tracking time and PDF size."""
+    backgrounds = {key: os.path.join(REPO_DIR, path) for key, path in BACKGROUND_IMAGES.items()}
+    for size in sizes:
+        print(f"\nBook of {size} puzzles")
+        args = build_parser().parse_args(book_arguments(size, seed))
+        with tempfile.TemporaryDirectory() as workdir, contextlib.chdir(workdir):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                manifest = generate_puzzle_sets(args)
+            generated = time.perf_counter()
+            create_sudoku_book("puzzles", "book", backgrounds, invariant=True, manifest=manifest)
+            rendered = time.perf_counter()
+
+            results.add(f"book.{size}.generate", generated - start)
+            results.add(f"book.{size}.render", rendered - generated)
+            results.add(f"book.{size}.pdf_size", os.path.getsize("book.pdf"), "bytes")
+
+
+def compare(metrics, baseline_path, threshold):
+    """Print the change of every metric against a baseline; returns the regressed names."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["metrics"]
+
+    print(f"\nCompared with {baseline_path} (threshold {threshold:.0%})")
+    regressions = []
+    for name, metric in metrics.items():
+        if name not in baseline or not baseline[name]["value"]:
+            continue
+        change = metric["value"] / baseline[name]["value"] - 1
+        status = ""
+        if change > threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            status = "improved"
+        print(f"{name:<32} {change:>+9.1%}  {status}")
+    return regressions
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog,
+                                     description="Benchmark puzzle generation, solving, linking and PDF building.")
+    parser.add_argument("-c", "--count", type=int, default=50,
+                        help="Number of inputs per microbenchmark")
+    parser.add_argument("--hints", type=int, nargs="+", default=[40, 36, 27, 18],
+                        help="Hint counts to benchmark the solver on")
+    parser.add_argument("--box-sizes", type=int, nargs="*", default=[2, 3, 4, 5],
+                        help="Box sizes to benchmark the exact cover engine on")
+    parser.add_argument("--books", type=int, nargs="*", default=[33, 300, 3000],
+                        help="Book sizes for the end-to-end runs")
+    parser.add_argument("--skip-micro", action="store_true", default=False,
+                        help="Only run the end-to-end books")
+    parser.add_argument("-s", "--seed", type=int, default=1,
+                        help="Random seed for every benchmark input")
+    parser.add_argument("-o", "--output", type=str, default=DEFAULT_RESULTS,
+                        help="JSON file to store the results in")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown or growth that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if any(size < 4 for size in args.books):
+        parser.error("every book needs at least 4 puzzles, one per mode")
+
+    results = Results()
+    if not args.skip_micro:
+        bench_micro(results, args.count, args.hints, args.seed)
+        bench_sizes(results, args.count, args.box_sizes, args.seed)
+    bench_books(results, args.books, args.seed)
+
+    results.save(args.output, args.seed)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results.metrics, args.baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import os
+import re
+from math import isqrt
+from xml.etree import ElementTree
+from sudokuGrid import Grid
+from profiling import profiler
+
+SVG_TEXT = "{http://www.w3.org/2000/svg}text"
+
+
+class PuzzleRecord:
+    """One puzzle of the book: its grid and solution Grids, (letter, row, col, value) links and optional grade."""
+
+    __slots__ = ("puzzle_id", "mode", "global_number", "grid", "solution", "links", "grade")
+
+    def __init__(self, puzzle_id, mode, global_number, grid, solution, links=None, grade=None):
+        self.puzzle_id = puzzle_id
+        self.mode = mode
+        self.global_number = global_number
+        self.grid = grid
+        self.solution = solution
+        self.links = links if links else []
+        self.grade = grade
+
+
+class BookManifest:
+    """Ordered puzzle records shared by the generator and every renderer."""
+
+    def __init__(self, records=None):
+        self.records = []
+        self._by_number = {}
+        self._by_mode = None
+        for record in records or []:
+            self.add(record)
+
+    def add(self, record):
+        if record.global_number in self._by_number:
+            raise ValueError(f"Duplicate puzzle number {record.global_number}")
+        if self.records and record.global_number < self.records[-1].global_number:
+            raise ValueError("Puzzle records must be added in book order")
+        self.records.append(record)
+        self._by_number[record.global_number] = record
+        self._by_mode = None
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, global_number):
+        return self._by_number.get(global_number)
+
+    def next_links(self, record):
+        """Links of the puzzle that follows record in its chain, if any."""
+        next_record = self._by_number.get(record.global_number + 1)
+        if next_record is None or next_record.mode != record.mode:
+            return []
+        return next_record.links
+
+    def by_mode(self):
+        """Records grouped by mode, keeping book order within and across modes."""
+        if self._by_mode is None:
+            self._by_mode = {}
+            for record in self.records:
+                self._by_mode.setdefault(record.mode, []).append(record)
+        return self._by_mode
+
+
+def parse_placeholder_line(line):
+    """Parse an 'a = R3C5 [=7]' line from a _placeholders.txt file."""
+    match = re.match(r'([a-z])\s*=\s*R(\d+)C(\d+)\s*(?:\[=([0-9])\])?', line.strip())
+    if not match:
+        return None
+    letter, row, col, value = match.groups()
+    return letter, int(row), int(col), int(value) if value else None
+
+
+def parse_grid_svg(path):
+    """Read the grid of a puzzle SVG, whose cell texts are written row by row."""
+    profiler.count("files.read")
+    texts = [element.text or "" for element in ElementTree.parse(path).iter(SVG_TEXT)]
+    size = isqrt(len(texts))
+    if size * size != len(texts) or size < 4:
+        raise ValueError(f"{path} does not hold a square Sudoku grid")
+    values = [int(text) if text.isdigit() else (text or 0) for text in texts]
+    return Grid.from_rows([values[row * size:(row + 1) * size] for row in range(size)])
+
+
+def load_manifest(puzzle_dir):
+    """Build a manifest from the SVG and placeholder files of a puzzle folder written by earlier runs."""
+    pattern = re.compile(r"^(\d+)\.\s*(([A-Z])\d+)\.svg$")
+    matches = sorted((m for m in map(pattern.match, os.listdir(puzzle_dir)) if m),
+                     key=lambda m: int(m.group(1)))
+    if not matches:
+        raise ValueError(f"No puzzle chain or puzzle SVGs found in {puzzle_dir}")
+
+    manifest = BookManifest()
+    for match in matches:
+        global_number, puzzle_id, mode = int(match.group(1)), match.group(2), match.group(3)
+        stem = os.path.join(puzzle_dir, f"{global_number}. {puzzle_id}")
+        if not os.path.exists(stem + "S.svg"):
+            raise ValueError(f"Puzzle {puzzle_id} has no solution file {stem}S.svg")
+
+        links = []
+        if os.path.exists(stem + "_placeholders.txt"):
+            profiler.count("files.read")
+            with open(stem + "_placeholders.txt", 'r') as f:
+                links = [link for link in map(parse_placeholder_line, f) if link]
+
+        manifest.add(PuzzleRecord(puzzle_id, mode, global_number, parse_grid_svg(stem + ".svg"),
+                                  parse_grid_svg(stem + "S.svg"), links))
+
+    return manifest
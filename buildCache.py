@@ -0,0 +1,87 @@
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import shutil
+
+
+class BuildCache:
+    """Persistent content-addressed store for incremental builds."""
+
+    def __init__(self, cache_dir=".leap_cache/build", max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = {}
+        self.misses = {}
+
+    def key(self, *parts):
+        """Hash of the inputs of an entry; bytes parts are hashed as they are."""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part if isinstance(part, bytes) else repr(part).encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def path(self, kind, key, ext):
+        return os.path.join(self.cache_dir, kind, key[:2], key + ext)
+
+    def get(self, kind, key, ext):
+        """Path of a cached entry, marked as just used, or None."""
+        path = self.path(kind, key, ext)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses[kind] = self.misses.get(kind, 0) + 1
+            return None
+        self.hits[kind] = self.hits.get(kind, 0) + 1
+        return path
+
+    def put_file(self, kind, key, ext, source):
+        """Move a finished file into the cache and return its cached path."""
+        path = self.path(kind, key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.move(source, path)
+        return path
+
+    def get_json(self, kind, key):
+        path = self.get(kind, key, ".json")
+        if path is None:
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def put_json(self, kind, key, data):
+        path = self.path(kind, key, ".json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", 'w') as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes; returns how many."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+
+@contextmanager
+def open_cache(cache_dir, max_bytes):
+    """BuildCache for one build, evicted down to max_bytes when the build ends."""
+    cache = BuildCache(cache_dir, max_bytes)
+    try:
+        yield cache
+    finally:
+        cache.evict()
@@ -0,0 +1,88 @@
+from bookManifest import BookManifest, PuzzleRecord
+from sudokuGrid import Grid
+from profiling import profiler
+import json
+import mmap
+import os
+import struct
+
+CHAIN_FILENAME = "chain.leap"
+CHAIN_MAGIC = b"LEAP"
+CHAIN_VERSION = 1
+
+# magic, version, grid size, record count
+HEADER = struct.Struct("<4sHHI")
+LINK = struct.Struct("<cBBB")
+
+
+def _record_struct(size):
+    """Fixed-size record: global number, mode, puzzle number, link count, grid, solution, links."""
+    cells = size * size
+    return struct.Struct(f"<IcHB{cells}s{cells}s{size * LINK.size}s")
+
+
+def write_chain(path, manifest, json_path=None):
+    """Write every record of the manifest to one chain file, and optionally a JSON mirror."""
+    records = list(manifest)
+    size = len(records[0].solution) if records else 9
+    record_struct = _record_struct(size)
+
+    buffer = bytearray(HEADER.size + record_struct.size * len(records))
+    HEADER.pack_into(buffer, 0, CHAIN_MAGIC, CHAIN_VERSION, size, len(records))
+    offset = HEADER.size
+    for record in records:
+        if len(record.links) > size:
+            raise ValueError(f"{record.puzzle_id} has more than {size} links")
+        links = b"".join(LINK.pack(letter.encode(), row, col, value)
+                         for letter, row, col, value in record.links)
+        record_struct.pack_into(buffer, offset, record.global_number, record.mode.encode(),
+                                int(record.puzzle_id[1:]), len(record.links),
+                                record.grid.cells, record.solution.cells, links)
+        offset += record_struct.size
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(buffer)
+    os.replace(tmp_path, path)
+    profiler.count("files.written")
+
+    if json_path:
+        profiler.count("files.written")
+        with open(json_path, 'w') as f:
+            json.dump({
+                "version": CHAIN_VERSION,
+                "size": size,
+                "puzzles": [{
+                    "id": record.puzzle_id,
+                    "mode": record.mode,
+                    "number": record.global_number,
+                    "grid": record.grid.to_rows(),
+                    "solution": record.solution.to_rows(),
+                    "links": [list(link) for link in record.links]
+                } for record in records]
+            }, f, indent=1)
+
+
+def read_chain(path):
+    """Load a chain file into a BookManifest through a memory map."""
+    profiler.count("files.read")
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        magic, version, size, count = HEADER.unpack_from(data, 0)
+        if magic != CHAIN_MAGIC:
+            raise ValueError(f"{path} is not a LEAP chain file")
+        if version != CHAIN_VERSION:
+            raise ValueError(f"Unsupported chain file version {version}")
+
+        record_struct = _record_struct(size)
+        manifest = BookManifest()
+        for index in range(count):
+            global_number, mode, puzzle_number, n_links, grid, solution, links = \
+                record_struct.unpack_from(data, HEADER.size + index * record_struct.size)
+            mode = mode.decode()
+            manifest.add(PuzzleRecord(
+                f"{mode}{puzzle_number}", mode, global_number,
+                Grid(grid, size), Grid(solution, size),
+                [(letter.decode(), row, col, value)
+                 for letter, row, col, value in LINK.iter_unpack(links[:n_links * LINK.size])]
+            ))
+    return manifest
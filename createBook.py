@@ -1,43 +1,138 @@
+from reportlab import rl_config
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
-from reportlab.graphics import renderPDF
 from reportlab.pdfbase import pdfmetrics
-from svglib.svglib import svg2rlg
+from assetCache import AssetCache
+from bookManifest import BookManifest, load_manifest
+from buildCache import open_cache
+from chainFile import CHAIN_FILENAME, read_chain
+from pdfConcat import PdfConcatenator
+from profiling import profiler
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from math import isqrt
+import hashlib
 import os
-import re
+import tempfile
+
+
+DEFAULT_CHUNK_PAGES = 50
+# Puzzle pages per chunk and chunks in flight while rendering alongside generation
+PIPELINE_CHUNK_PAGES = 10
+PIPELINE_QUEUE_CHUNKS = 4
+
+# Page kinds whose content does not depend on the puzzles, stamped in from templates
+STATIC_PAGES = ('cover', 'instructions', 'transition', 'solutions')
+TEMPLATE_DIR = ".leap_cache/templates"
+TEMPLATE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Sections of the --compact size report, by page kind
+PAGE_SECTIONS = {'cover': 'front matter', 'index': 'front matter', 'instructions': 'front matter',
+                 'transition': 'puzzles', 'puzzle': 'puzzles',
+                 'solutions': 'solutions', 'solution_page': 'solutions'}
+# Background image each page kind draws; the cover falls back to the instructions image
+JOB_BACKGROUNDS = {'cover': 'cover', 'index': 'index', 'instructions': 'instructions',
+                   'transition': 'transition', 'puzzle': 'puzzle',
+                   'solutions': 'transition', 'solution_page': 'solutions'}
 
 
 class SudokuBookCreator:
-    def __init__(self, output_filename="Sudoku_Book.pdf", include_cover_text=False, background_images=None):
+    def __init__(self, output_filename="Sudoku_Book.pdf", include_cover_text=False, background_images=None,
+                 invariant=False, asset_cache=None, chunk_pages=0, render_workers=1, page_cache=None,
+                 template_cache=None, compact=False):
         self.output_filename = output_filename
+        self.invariant = invariant
+        self.compact = compact
+        self.chunk_pages = chunk_pages
+        self.render_workers = render_workers
+        self.page_cache = page_cache
+        self.template_cache = template_cache
+        self._digest = None
+        self._background_hashes = {}
         self.page_width, self.page_height = A4
         self.page_margin = 50
         self.grid_size = min((self.page_width - 2 * self.page_margin),
                             (self.page_height - 4 * self.page_margin)) * 0.6
         self.include_cover_text = include_cover_text
         self.background_images = background_images if background_images else {}
-
-    def parse_placeholder_format(self, line):
-        match = re.match(r'([a-z])\s*=\s*R(\d+)C(\d+)\s*(?:\[=[0-9]\])?', line.strip())
-        return (match.groups() if match else line.strip())
-
-    def fetch_next_puzzle_placeholders(self, current_number, puzzle_dir):
-        puzzle_files = sorted(os.listdir(puzzle_dir))
-        current_pattern = rf"^{current_number}\.\s*([A-Z]\d+)\.svg$"
-
-        for index, filename in enumerate(puzzle_files):
-            match = re.match(current_pattern, filename)
-            if match:
-                current_id = match.group(1)
-                letter, digit = re.match(r"([A-Z])(\d+)", current_id).groups()
-                next_id = f"{letter}{int(digit) + 1}"
-                next_placeholder_file = f"{current_number + 1}. {next_id}_placeholders.txt"
-                placeholder_path = os.path.join(puzzle_dir, next_placeholder_file)
-
-                if os.path.exists(placeholder_path):
-                    with open(placeholder_path, 'r') as f:
-                        return [self.parse_placeholder_format(line) for line in f]
-        return []
+        if asset_cache:
+            self.background_images = {
+                page: asset_cache.prepare(path, self.page_width, self.page_height)
+                for page, path in self.background_images.items()
+            }
+        # Grid geometry of the SVG export: 40px cells, 96dpi px to pt
+        self.cell_size = 40
+        self.px_to_pt = 0.75
+        self.solutions_per_page = 9
+
+    def grid_extent(self, grid):
+        """Side of the unscaled grid in points."""
+        return len(grid) * self.cell_size * self.px_to_pt
+
+    def _grid_form(self, canvas_obj, grid_size):
+        """Name of the form holding the grid lines and border, defined on first use."""
+        name = f"grid{grid_size}"
+        if canvas_obj.hasForm(name):
+            return name
+
+        cell_size = self.cell_size
+        extent = grid_size * cell_size
+        canvas_obj.beginForm(name, -5, -5, extent + 5, extent + 5)
+
+        canvas_obj.setStrokeColorRGB(0, 0, 0)
+        canvas_obj.setLineWidth(3)
+        for i in range(1, grid_size):
+            if i % isqrt(grid_size) == 0:
+                canvas_obj.line(0, extent - i * cell_size, extent, extent - i * cell_size)
+                canvas_obj.line(i * cell_size, 0, i * cell_size, extent)
+
+        canvas_obj.setLineWidth(1)
+        for row in range(grid_size):
+            for col in range(grid_size):
+                canvas_obj.rect(col * cell_size, row * cell_size, cell_size, cell_size, stroke=1, fill=0)
+
+        canvas_obj.setStrokeColorRGB(1, 0, 0)
+        canvas_obj.setLineWidth(5)
+        canvas_obj.rect(0, 0, extent, extent, stroke=1, fill=0)
+
+        canvas_obj.endForm()
+        return name
+
+    def _glyph_form(self, canvas_obj, value):
+        """Name of the form holding one digit or placeholder letter centred on the origin."""
+        name = f"glyph_{value}"
+        if canvas_obj.hasForm(name):
+            return name
+
+        half = self.cell_size / 2
+        canvas_obj.beginForm(name, -half, -half, half, half)
+        canvas_obj.setFillColorRGB(0, 0, 0)
+        canvas_obj.setFont("Helvetica", 20)
+        canvas_obj.drawCentredString(0, 0, str(value))
+        canvas_obj.endForm()
+        return name
+
+    def draw_grid(self, canvas_obj, grid, x_pos, y_pos, scale):
+        """Draw a grid with its lower-left corner at (x_pos, y_pos), laid out like createPuzzleSvg."""
+        grid_size = len(grid)
+        cell_size = self.cell_size
+        extent = grid_size * cell_size
+
+        canvas_obj.saveState()
+        canvas_obj.translate(x_pos, y_pos)
+        canvas_obj.scale(scale * self.px_to_pt, scale * self.px_to_pt)
+        canvas_obj.doForm(self._grid_form(canvas_obj, grid_size))
+
+        origin_x = origin_y = 0
+        for index, value in grid.filled():
+            center_x = (index % grid_size + 0.5) * cell_size
+            center_y = extent - (index // grid_size + 0.5) * cell_size
+            canvas_obj.translate(center_x - origin_x, center_y - origin_y)
+            origin_x, origin_y = center_x, center_y
+            canvas_obj.doForm(self._glyph_form(canvas_obj, value))
+
+        canvas_obj.restoreState()
 
     def _render_index_content(self, canvas_obj, mode_data):
         if self.background_images.get('index'):
@@ -120,36 +215,29 @@ class SudokuBookCreator:
 
         canvas_obj.showPage()
 
-    def _render_puzzle_page(self, canvas_obj, puzzle_path, puzzle_number):
+    def _render_puzzle_page(self, canvas_obj, record, next_links):
         if self.background_images.get('puzzle'):
             canvas_obj.drawImage(self.background_images['puzzle'], 
                                0, 0, self.page_width, self.page_height)
 
-        drawing = svg2rlg(puzzle_path)
-        if drawing:
-            scale = min(self.grid_size / drawing.width,
-                       self.grid_size / drawing.height) * 1.2
-            drawing.scale(scale, scale)
+        extent = self.grid_extent(record.grid)
+        scale = self.grid_size / extent * 1.2
 
-            x_pos = (self.page_width - drawing.width * scale) / 2
-            y_pos = (self.page_height - drawing.height * scale) / 2 + 120
+        x_pos = (self.page_width - extent * scale) / 2
+        y_pos = (self.page_height - extent * scale) / 2 + 120
 
-            renderPDF.draw(drawing, canvas_obj, x_pos, y_pos)
+        self.draw_grid(canvas_obj, record.grid, x_pos, y_pos, scale)
 
-        placeholders = self.fetch_next_puzzle_placeholders(
-            puzzle_number, os.path.dirname(puzzle_path))
-        
-        if placeholders:
-            self._render_placeholder_table(canvas_obj, placeholders)
+        if next_links:
+            self._render_placeholder_table(canvas_obj, next_links)
 
-        puzzle_id = re.search(r'[EMAG]\d+', os.path.basename(puzzle_path)).group()
         canvas_obj.setFont("Helvetica", 12)
-        canvas_obj.drawCentredString(self.page_width/2, self.page_margin, puzzle_id)
+        canvas_obj.drawCentredString(self.page_width/2, self.page_margin, record.puzzle_id)
 
         canvas_obj.showPage()
 
-    def _render_placeholder_table(self, canvas_obj, placeholders):
-        table_height = len(placeholders) * 18 + 25
+    def _render_placeholder_table(self, canvas_obj, links):
+        table_height = len(links) * 18 + 25
         y_start = min(self.page_height - self.page_margin - table_height, 
                      self.page_margin + 200)
 
@@ -172,19 +260,18 @@ class SudokuBookCreator:
         canvas_obj.drawCentredString(x_positions[2], y_start, "Column")
         canvas_obj.drawCentredString(x_positions[3], y_start, "Value")
 
-        for i, placeholder in enumerate(placeholders):
+        for i, (letter, row, col, _) in enumerate(links):
             y_position = y_start - (i + 1) * 18
-            letter, row, col = placeholder
             
             canvas_obj.setFont("Helvetica-Bold", 12)
-            canvas_obj.drawCentredString(x_positions[0], y_position, letter.strip())
+            canvas_obj.drawCentredString(x_positions[0], y_position, letter)
             
             canvas_obj.setFont("Helvetica", 12)
-            canvas_obj.drawCentredString(x_positions[1], y_position, row)
-            canvas_obj.drawCentredString(x_positions[2], y_position, col)
+            canvas_obj.drawCentredString(x_positions[1], y_position, str(row))
+            canvas_obj.drawCentredString(x_positions[2], y_position, str(col))
             canvas_obj.drawCentredString(x_positions[3], y_position, "__")
 
-    def _render_solutions_section(self, canvas_obj, puzzle_dir):
+    def _render_solutions_title(self, canvas_obj):
         if self.background_images.get('transition'):
             canvas_obj.drawImage(self.background_images['transition'], 
                                0, 0, self.page_width, self.page_height)
@@ -193,104 +280,80 @@ class SudokuBookCreator:
         canvas_obj.drawCentredString(self.page_width/2, self.page_height/2, "SOLUTIONS")
         canvas_obj.showPage()
 
-        solutions_per_page = 9
-        rows, cols = 3, 3
-        solution_width = (self.page_width - 2 * self.page_margin) / cols
-        solution_height = (self.page_height - 3 * self.page_margin) / rows
-        solution_size = min(solution_width, solution_height) * 0.8
-
-        puzzle_files = sorted([f for f in os.listdir(puzzle_dir) 
-                             if f.endswith('.svg') and not f.endswith('S.svg')],
-                            key=lambda x: int(re.search(r'(\d+)', x).group()))
-
+    def _solution_groups(self, manifest):
         difficulty_groups = {
-            'E': {'files': [], 'name': 'Easy Mode'},
-            'M': {'files': [], 'name': 'Medium Mode'},
-            'A': {'files': [], 'name': 'Advanced Mode'},
-            'G': {'files': [], 'name': 'Grandmaster Mode'}
+            'E': {'records': [], 'name': 'Easy Mode'},
+            'M': {'records': [], 'name': 'Medium Mode'},
+            'A': {'records': [], 'name': 'Advanced Mode'},
+            'G': {'records': [], 'name': 'Grandmaster Mode'}
         }
 
-        for puzzle_file in puzzle_files:
-            difficulty = puzzle_file[puzzle_file.find('.')+2]
-            if difficulty in difficulty_groups:
-                difficulty_groups[difficulty]['files'].append(puzzle_file)
+        for mode, records in manifest.by_mode().items():
+            if mode in difficulty_groups:
+                difficulty_groups[mode]['records'] = records
 
-        self._render_solution_pages(canvas_obj, difficulty_groups, 
-                                  puzzle_dir, solutions_per_page, 
-                                  solution_size, rows, cols)
+        return difficulty_groups
 
-    def _render_solution_pages(self, canvas_obj, difficulty_groups, puzzle_dir,
-                             solutions_per_page, solution_size, rows, cols):
+    def _render_solution_page(self, canvas_obj, group, start):
+        rows, cols = 3, 3
         solution_width = (self.page_width - 2 * self.page_margin) / cols
         solution_height = (self.page_height - 3 * self.page_margin) / rows
+        solution_size = min(solution_width, solution_height) * 0.8
 
-        for difficulty, group in difficulty_groups.items():
-            if not group['files']:
-                continue
-
-            for i in range(0, len(group['files']), solutions_per_page):
-                if self.background_images.get('solutions'):
-                    canvas_obj.drawImage(self.background_images['solutions'], 
-                                       0, 0, self.page_width, self.page_height)
-
-                canvas_obj.setFont("Helvetica-Bold", 24)
-                canvas_obj.drawCentredString(self.page_width/2, 
-                                           self.page_height - self.page_margin, 
-                                           group['name'])
+        if self.background_images.get('solutions'):
+            canvas_obj.drawImage(self.background_images['solutions'], 
+                               0, 0, self.page_width, self.page_height)
 
-                for j, puzzle_file in enumerate(group['files'][i:i + solutions_per_page]):
-                    solution_file = puzzle_file.replace('.svg', 'S.svg')
-                    solution_path = os.path.join(puzzle_dir, solution_file)
+        canvas_obj.setFont("Helvetica-Bold", 24)
+        canvas_obj.drawCentredString(self.page_width/2, 
+                                   self.page_height - self.page_margin, 
+                                   group['name'])
 
-                    if os.path.exists(solution_path):
-                        self._render_single_solution(canvas_obj, solution_path, 
-                                                  j, rows, cols, solution_size,
-                                                  solution_width, solution_height,
-                                                  puzzle_file)
+        for j, record in enumerate(group['records'][start:start + self.solutions_per_page]):
+            self._render_single_solution(canvas_obj, record, 
+                                      j, rows, cols, solution_size,
+                                      solution_width, solution_height)
 
-                canvas_obj.setFont("Helvetica", 12)
-                page_num = (i // solutions_per_page) + 1
-                total_pages = (len(group['files']) + solutions_per_page - 1) // solutions_per_page
-                canvas_obj.drawCentredString(self.page_width/2, self.page_margin,
-                                           f"{group['name']} - Page {page_num} of {total_pages}")
+        canvas_obj.setFont("Helvetica", 12)
+        page_num = (start // self.solutions_per_page) + 1
+        total_pages = (len(group['records']) + self.solutions_per_page - 1) // self.solutions_per_page
+        canvas_obj.drawCentredString(self.page_width/2, self.page_margin,
+                                   f"{group['name']} - Page {page_num} of {total_pages}")
 
-                canvas_obj.showPage()
+        canvas_obj.showPage()
 
-    def _render_single_solution(self, canvas_obj, solution_path, position, 
+    def _render_single_solution(self, canvas_obj, record, position, 
                               rows, cols, solution_size, solution_width, 
-                              solution_height, puzzle_file):
-        drawing = svg2rlg(solution_path)
-        if drawing:
-            row = position // cols
-            col = position % cols
+                              solution_height):
+        row = position // cols
+        col = position % cols
 
-            scale = min(solution_size / drawing.width,
-                       solution_size / drawing.height)
-            drawing.scale(scale, scale)
+        extent = self.grid_extent(record.solution)
+        scale = solution_size / extent
 
-            cell_center_x = self.page_margin + col * solution_width + solution_width/2
-            cell_center_y = self.page_height - (2*self.page_margin + 
-                                              row * solution_height + solution_height/2)
+        cell_center_x = self.page_margin + col * solution_width + solution_width/2
+        cell_center_y = self.page_height - (2*self.page_margin + 
+                                          row * solution_height + solution_height/2)
 
-            x_pos = cell_center_x - (drawing.width * scale) / 2
-            y_pos = cell_center_y - (drawing.height * scale) / 2
+        x_pos = cell_center_x - (extent * scale) / 2
+        y_pos = cell_center_y - (extent * scale) / 2
 
-            renderPDF.draw(drawing, canvas_obj, x_pos, y_pos)
+        self.draw_grid(canvas_obj, record.solution, x_pos, y_pos, scale)
 
-            puzzle_id = re.search(r'[EMAG]\d+', puzzle_file).group()
-            canvas_obj.setFont("Helvetica", 10)
-            canvas_obj.drawCentredString(cell_center_x, y_pos - 20, f"Solution - {puzzle_id}")
+        canvas_obj.setFont("Helvetica", 10)
+        canvas_obj.drawCentredString(cell_center_x, y_pos - 20, f"Solution - {record.puzzle_id}")
 
-    def _render_rules_section(self, canvas_obj):
+    def _render_rules_section(self, canvas_obj, size=9):
         y_position = self.page_height - 180
         canvas_obj.setFont("Helvetica-Bold", 16)
         canvas_obj.drawString(self.page_margin, y_position, "Basic Sudoku Rules:")
 
+        box = isqrt(size)
         rules = [
-            "• Fill in the 9×9 grid with numbers 1-9",
-            "• Each row must contain all numbers 1-9",
-            "• Each column must contain all numbers 1-9",
-            "• Each 3×3 box must contain all numbers 1-9"
+            f"• Fill in the {size}×{size} grid with numbers 1-{size}",
+            f"• Each row must contain all numbers 1-{size}",
+            f"• Each column must contain all numbers 1-{size}",
+            f"• Each {box}×{box} box must contain all numbers 1-{size}"
         ]
 
         canvas_obj.setFont("Helvetica", 12)
@@ -384,7 +447,7 @@ class SudokuBookCreator:
         canvas_obj.setFont("Helvetica", 12)
         canvas_obj.drawCentredString(self.page_width/2, self.page_margin, "Instructions")
 
-    def _render_instruction_sections(self, canvas_obj):
+    def _render_instruction_sections(self, canvas_obj, size=9):
         sections = {
             'title': {
                 'text': "How to Play Linked Sudoku",
@@ -410,7 +473,7 @@ class SudokuBookCreator:
                     text_obj.textLine(line)
                 canvas_obj.drawText(text_obj)
 
-        self._render_rules_section(canvas_obj)
+        self._render_rules_section(canvas_obj, size)
         self._render_gameplay_section(canvas_obj)
         self._render_difficulty_section(canvas_obj)
 
@@ -430,34 +493,34 @@ class SudokuBookCreator:
 
         canvas_obj.showPage()
 
-    def render_instructions_page(self, canvas_obj):
+    def render_instructions_page(self, canvas_obj, size=9):
         if self.background_images.get('instructions'):
             canvas_obj.drawImage(self.background_images['instructions'], 0, 0, 
                                self.page_width, self.page_height)
 
-        self._render_instruction_sections(canvas_obj)
+        self._render_instruction_sections(canvas_obj, size)
         canvas_obj.showPage()
 
     def _wrap_text(self, text, font_name, font_size, max_width):
-        words = text.split()
-        lines, current_line = [], []
-
-        for word in words:
-            current_line.append(word)
-            if pdfmetrics.stringWidth(' '.join(current_line), font_name, font_size) > max_width:
-                current_line.pop()
+        """Greedily break text into lines no wider than max_width."""
+        space = pdfmetrics.stringWidth(' ', font_name, font_size)
+        lines, current_line, width = [], [], 0
+
+        for word in text.split():
+            word_width = pdfmetrics.stringWidth(word, font_name, font_size)
+            line_width = width + space + word_width if current_line else word_width
+            if line_width > max_width:
                 lines.append(' '.join(current_line))
-                current_line = [word]
+                current_line, width = [word], word_width
+            else:
+                current_line.append(word)
+                width = line_width
 
         if current_line:
             lines.append(' '.join(current_line))
         return lines
 
-    def render_index_page(self, canvas_obj, puzzle_dir):
-        puzzle_files = sorted([f for f in os.listdir(puzzle_dir) 
-                             if f.endswith('.svg') and not f.endswith('S.svg')],
-                            key=lambda x: int(re.search(r'(\d+)', x).group()))
-
+    def render_index_page(self, canvas_obj, manifest):
         mode_data = {
             'E': {'name': 'Easy Mode', 'puzzles': []},
             'M': {'name': 'Medium Mode', 'puzzles': []},
@@ -465,44 +528,362 @@ class SudokuBookCreator:
             'G': {'name': 'Grandmaster Mode', 'puzzles': []}
         }
 
-        for puzzle in puzzle_files:
-            mode = puzzle[puzzle.find('.')+2]
-            if mode in mode_data:
-                mode_data[mode]['puzzles'].append(re.search(r'[EMAG]\d+', puzzle).group())
+        for record in manifest:
+            if record.mode in mode_data:
+                mode_data[record.mode]['puzzles'].append(record.puzzle_id)
 
         self._render_index_content(canvas_obj, mode_data)
         canvas_obj.showPage()
 
-    def create_book(self, puzzle_dir):
-        canvas_obj = canvas.Canvas(self.output_filename, pagesize=A4)
-        
-        self.render_cover_page(canvas_obj)
-        self.render_index_page(canvas_obj, puzzle_dir)
-        self.render_instructions_page(canvas_obj)
-
-        puzzle_files = sorted([f for f in os.listdir(puzzle_dir) 
-                             if f.endswith('.svg') and not f.endswith('S.svg')],
-                            key=lambda x: int(re.search(r'(\d+)', x).group()))
+    def page_plan(self, manifest):
+        """The book as an ordered list of (kind, argument) jobs for render_job."""
+        size = next(iter(manifest)).grid.size if len(manifest) else 9
+        plan = [('cover', None), ('index', None), ('instructions', size)]
 
         current_mode = None
-        for puzzle_file in puzzle_files:
-            puzzle_path = os.path.join(puzzle_dir, puzzle_file)
-            puzzle_number = int(re.search(r'(\d+)', puzzle_file).group())
-            mode = puzzle_file[puzzle_file.find('.')+2]
+        for record in manifest:
+            if record.mode != current_mode:
+                plan.append(('transition', record.mode))
+                current_mode = record.mode
+            plan.append(('puzzle', record.global_number))
+
+        plan.append(('solutions', None))
+        for mode, group in self._solution_groups(manifest).items():
+            for start in range(0, len(group['records']), self.solutions_per_page):
+                plan.append(('solution_page', (mode, start)))
+
+        return plan
+
+    def render_job(self, canvas_obj, manifest, job):
+        """Render the page (or pages, for the index) of one page_plan job."""
+        kind, argument = job
+        if kind == 'cover':
+            self.render_cover_page(canvas_obj)
+        elif kind == 'index':
+            self.render_index_page(canvas_obj, manifest)
+        elif kind == 'instructions':
+            self.render_instructions_page(canvas_obj, argument)
+        elif kind == 'transition':
+            self._render_mode_transition(canvas_obj, argument)
+        elif kind == 'puzzle':
+            record = manifest.get(argument)
+            self._render_puzzle_page(canvas_obj, record, manifest.next_links(record))
+        elif kind == 'solutions':
+            self._render_solutions_title(canvas_obj)
+        elif kind == 'solution_page':
+            mode, start = argument
+            self._render_solution_page(canvas_obj, self._solution_groups(manifest)[mode], start)
+        else:
+            raise ValueError(f"Unknown page job {kind!r}")
+
+    def job_inputs(self, manifest, job):
+        """Everything besides the renderer itself that the pages of a page_plan job depend on."""
+        return self.background_hash(job[0]), self._content_inputs(manifest, job)
+
+    def _content_inputs(self, manifest, job):
+        kind, argument = job
+        if kind == 'cover':
+            return self.include_cover_text, self.output_filename if self.include_cover_text else None
+        if kind == 'index':
+            return [(record.mode, record.puzzle_id) for record in manifest]
+        if kind == 'puzzle':
+            record = manifest.get(argument)
+            return record.puzzle_id, record.grid.cells, manifest.next_links(record)
+        if kind == 'solution_page':
+            mode, start = argument
+            records = self._solution_groups(manifest)[mode]['records']
+            return mode, start, len(records), [(record.puzzle_id, record.solution.cells)
+                                               for record in records[start:start + self.solutions_per_page]]
+        return argument
+
+    def background_hash(self, kind):
+        """Content hash of the background image a page kind draws, or None without one."""
+        page = JOB_BACKGROUNDS[kind]
+        if page not in self._background_hashes:
+            path = self.background_images.get(page)
+            if page == 'cover' and path is None:
+                path = self.background_images.get('instructions')
+            digest = None
+            if path and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+            self._background_hashes[page] = digest
+        return self._background_hashes[page]
+
+    def render_digest(self):
+        """Hash of this module's source and the settings every page is drawn with."""
+        digest = hashlib.sha256()
+        with open(__file__, 'rb') as f:
+            digest.update(f.read())
+        digest.update(repr((self.invariant, self.compact, self.page_width, self.page_height)).encode())
+        return digest.hexdigest()
+
+    def render_jobs(self, filename, manifest, jobs):
+        """Render a run of page_plan jobs into their own PDF file; returns the page count of each job."""
+        canvas_obj = canvas.Canvas(filename, pagesize=A4, invariant=self.invariant,
+                                   pageCompression=1 if self.compact else None)
+        # reportlab reads useA85 globally while drawing and saving; compact
+        # output stores streams as binary instead of 25% larger ASCII85 text
+        use_a85 = rl_config.useA85
+        rl_config.useA85 = use_a85 and not self.compact
+        try:
+            page_counts = []
+            for job in jobs:
+                first_page = canvas_obj.getPageNumber()
+                self.render_job(canvas_obj, manifest, job)
+                page_counts.append(canvas_obj.getPageNumber() - first_page)
+            canvas_obj.save()
+        finally:
+            rl_config.useA85 = use_a85
+        profiler.count("files.written")
+        return page_counts
+
+    def template(self, manifest, job):
+        """Path of the cached single-page PDF of a static job, rendered on first use."""
+        cache = self.template_cache
+        if self._digest is None:
+            self._digest = self.render_digest()
+        key = cache.key(self._digest, job[0], self.job_inputs(manifest, job))
+        path = cache.get("templates", key, ".pdf")
+        if path is None:
+            output_dir = os.path.dirname(os.path.abspath(self.output_filename))
+            with tempfile.TemporaryDirectory(dir=output_dir) as template_dir:
+                rendered = os.path.join(template_dir, "template.pdf")
+                self.render_jobs(rendered, manifest, [job])
+                path = cache.put_file("templates", key, ".pdf", rendered)
+        return path
+
+    def create_book(self, manifest):
+        plan = self.page_plan(manifest)
+        if self.page_cache is not None:
+            self._create_book_cached(manifest, plan)
+            return
+        if self.template_cache is None and not self.compact and not self.chunk_pages and self.render_workers <= 1:
+            self.render_jobs(self.output_filename, manifest, plan)
+            return
+
+        # Streaming mode: each chunk's canvas is saved and merged before the
+        # next one starts, so only one chunk's pages are held in memory.
+        # Chunk boundaries never depend on the worker count, so the merged
+        # file is the same however many processes render it.
+        jobs = [job for job in plan if not self._is_static(job)]
+        if self.chunk_pages or self.render_workers > 1:
+            chunk_pages = self.chunk_pages or DEFAULT_CHUNK_PAGES
+        else:
+            chunk_pages = max(len(jobs), 1)
+        output_dir = os.path.dirname(os.path.abspath(self.output_filename))
+        with tempfile.TemporaryDirectory(dir=output_dir) as chunk_dir, \
+                PdfConcatenator(self.output_filename, self.compact, self.invariant) as concatenator:
+            parts = [(os.path.join(chunk_dir, f"{start}.pdf"), jobs[start:start + chunk_pages])
+                     for start in range(0, len(jobs), chunk_pages)]
+
+            if self.render_workers > 1:
+                executor = ProcessPoolExecutor(max_workers=self.render_workers, initializer=_init_render_worker,
+                                               initargs=(self, manifest))
+                rendered = executor.map(_render_part, parts)
+            else:
+                executor = None
+                rendered = (self._render_chunk(manifest, part) for part in parts)
+
+            with executor or nullcontext():
+                self._assemble(manifest, plan, rendered, concatenator, count_files=executor is not None)
+
+        if self.compact:
+            self.report_sizes(concatenator.section_bytes)
+
+    def _is_static(self, job):
+        return self.template_cache is not None and job[0] in STATIC_PAGES
+
+    def _assemble(self, manifest, plan, rendered, concatenator, count_files=False):
+        """Append the pages of plan in order, deleting each rendered chunk once it is used up."""
+        # The chunk being appended: its path, the page count of each of its
+        # jobs, how many jobs are placed, and the pending page range
+        chunk_path, page_counts, placed, first, last = None, [], 0, 0, 0
+        section = None
+        for job in plan:
+            if self._is_static(job) or PAGE_SECTIONS[job[0]] != section:
+                if first < last:
+                    concatenator.append(chunk_path, first, last)
+                    first = last
+            if PAGE_SECTIONS[job[0]] != section:
+                section = PAGE_SECTIONS[job[0]]
+                concatenator.section(section)
+            if self._is_static(job):
+                concatenator.append(self.template(manifest, job))
+                continue
+
+            if placed == len(page_counts):
+                if chunk_path is not None:
+                    if first < last:
+                        concatenator.append(chunk_path, first, last)
+                    concatenator.release(chunk_path)
+                    os.remove(chunk_path)
+                chunk_path, page_counts = next(rendered)
+                if count_files:
+                    profiler.count("files.written")
+                placed = first = last = 0
+            last += page_counts[placed]
+            placed += 1
+
+        if chunk_path is not None:
+            if first < last:
+                concatenator.append(chunk_path, first, last)
+            concatenator.release(chunk_path)
+            os.remove(chunk_path)
+
+    def stream_book(self, records, queue_size=PIPELINE_QUEUE_CHUNKS):
+        """Render the book while its puzzle records are still being generated; returns the manifest."""
+        manifest = BookManifest()
+        chunk_pages = self.chunk_pages or PIPELINE_CHUNK_PAGES
+        output_dir = os.path.dirname(os.path.abspath(self.output_filename))
+        with tempfile.TemporaryDirectory(dir=output_dir) as chunk_dir, \
+                ProcessPoolExecutor(max_workers=self.render_workers, initializer=_init_render_worker,
+                                    initargs=(self, None)) as executor:
+            in_flight = deque()
+            puzzle_parts, solution_parts = [], []
+
+            def submit(parts, jobs, chunk_records):
+                while in_flight and (in_flight[0].done() or len(in_flight) >= queue_size):
+                    in_flight.popleft().result()
+                path = os.path.join(chunk_dir, f"{len(puzzle_parts) + len(solution_parts)}.pdf")
+                future = executor.submit(_render_records, (path, jobs, chunk_records))
+                in_flight.append(future)
+                parts.append((future, jobs))
+
+            def submit_solutions(mode_records):
+                jobs = []
+                if not solution_parts and not self._is_static(('solutions', None)):
+                    jobs.append(('solutions', None))
+                jobs += [('solution_page', (mode_records[0].mode, start))
+                         for start in range(0, len(mode_records), self.solutions_per_page)]
+                submit(solution_parts, jobs, mode_records)
+
+            jobs, chunk_records, mode_records = [], [], []
+            for record in records:
+                manifest.add(record)
+                if chunk_records and len(jobs) >= chunk_pages:
+                    # The last page of the chunk needs this record's links
+                    submit(puzzle_parts, jobs, chunk_records + [record])
+                    jobs, chunk_records = [], []
+                if mode_records and record.mode != mode_records[-1].mode:
+                    submit_solutions(mode_records)
+                    mode_records = []
+                if not mode_records and not self._is_static(('transition', record.mode)):
+                    jobs.append(('transition', record.mode))
+                jobs.append(('puzzle', record.global_number))
+                chunk_records.append(record)
+                mode_records.append(record)
+            if jobs:
+                submit(puzzle_parts, jobs, chunk_records)
+            if mode_records:
+                submit_solutions(mode_records)
+
+            plan = self.page_plan(manifest)
+            front = [job for job in plan if PAGE_SECTIONS[job[0]] == 'front matter' and not self._is_static(job)]
+            parts = [(executor.submit(_render_records, (os.path.join(chunk_dir, "front.pdf"), front,
+                                                        manifest.records)), front)]
+            parts += puzzle_parts + solution_parts
+            if [job for _, jobs in parts for job in jobs] != [job for job in plan if not self._is_static(job)]:
+                # Modes arrived out of the book's order; lay the pages out again
+                self.create_book(manifest)
+                return manifest
+
+            with PdfConcatenator(self.output_filename, self.compact, self.invariant) as concatenator:
+                rendered = (future.result() for future, _ in parts)
+                self._assemble(manifest, plan, rendered, concatenator, count_files=True)
+
+        if self.compact:
+            self.report_sizes(concatenator.section_bytes)
+        return manifest
+
+    def report_sizes(self, section_bytes):
+        """Print the size of the output file and of each section of the book."""
+        sections = [f"{name} {size / 1024:.1f} KB" for name, size in section_bytes.items() if name]
+        sections.append(f"header, page tree and xref {section_bytes.get(None, 0) / 1024:.1f} KB")
+        print(f"  Size: {os.path.getsize(self.output_filename) / 1024:.1f} KB ({', '.join(sections)})")
+
+    def _render_chunk(self, manifest, part):
+        chunk_path, jobs = part
+        return chunk_path, self.render_jobs(chunk_path, manifest, jobs)
+
+    def _create_book_cached(self, manifest, plan):
+        """Incremental build: render only the page jobs whose inputs changed, then stitch every cached page."""
+        cache = self.page_cache
+        digest = self.render_digest()
+        # Keyed by kind rather than the whole job, so pages that only moved in the book are reused
+        keys = [cache.key(digest, job[0], self.job_inputs(manifest, job)) for job in plan]
+        paths = [cache.get("pages", key, ".pdf") for key in keys]
+        missing = [index for index, path in enumerate(paths) if path is None]
+
+        output_dir = os.path.dirname(os.path.abspath(self.output_filename))
+        with tempfile.TemporaryDirectory(dir=output_dir) as page_dir:
+            parts = [(os.path.join(page_dir, f"{index}.pdf"), [plan[index]]) for index in missing]
+            if self.render_workers > 1 and len(parts) > 1:
+                with ProcessPoolExecutor(max_workers=self.render_workers, initializer=_init_render_worker,
+                                         initargs=(self, manifest)) as executor:
+                    rendered = [page_path for page_path, _ in executor.map(_render_part, parts)]
+                profiler.count("files.written", len(rendered))
+            else:
+                rendered = []
+                for page_path, jobs in parts:
+                    self.render_jobs(page_path, manifest, jobs)
+                    rendered.append(page_path)
+            for index, page_path in zip(missing, rendered):
+                paths[index] = cache.put_file("pages", keys[index], ".pdf", page_path)
+
+        with PdfConcatenator(self.output_filename, self.compact, self.invariant) as concatenator:
+            section = None
+            for job, path in zip(plan, paths):
+                if PAGE_SECTIONS[job[0]] != section:
+                    section = PAGE_SECTIONS[job[0]]
+                    concatenator.section(section)
+                concatenator.append(path)
+        print(f"  Pages: {len(plan) - len(missing)} cached, {len(missing)} rendered")
+        if self.compact:
+            self.report_sizes(concatenator.section_bytes)
+
+
+_render_worker_state = None
+
+
+def _init_render_worker(creator, manifest):
+    global _render_worker_state
+    _render_worker_state = (creator, manifest)
+
 
-            if mode != current_mode:
-                self._render_mode_transition(canvas_obj, mode)
-                current_mode = mode
+def _render_part(part):
+    """Render one chunk of page jobs in a worker process; returns its path and page counts."""
+    creator, manifest = _render_worker_state
+    return creator._render_chunk(manifest, part)
 
-            self._render_puzzle_page(canvas_obj, puzzle_path, puzzle_number)
 
-        self._render_solutions_section(canvas_obj, puzzle_dir)
-        canvas_obj.save()
+def _render_records(part):
+    """Render one chunk of page jobs from the records it needs, for SudokuBookCreator.stream_book."""
+    chunk_path, jobs, records = part
+    creator = _render_worker_state[0]
+    return creator._render_chunk(BookManifest(records), (chunk_path, jobs))
 
 
 def create_sudoku_book(puzzle_dir, output_filename="Sudoku_Book.pdf", 
-                      background_images=None, include_cover_text=False):
+                      background_images=None, include_cover_text=False, invariant=False,
+                      asset_dpi=150, manifest=None, chunk_pages=0, render_workers=1, page_cache=None,
+                      templates=True, compact=False, records=None):
+    """Render the book from the manifest, from records as they are generated, or else from puzzle_dir."""
     output_filename = output_filename.strip() if output_filename.endswith(".pdf") \
                      else f"{output_filename.strip()}.pdf"
-    creator = SudokuBookCreator(output_filename, include_cover_text, background_images)
-    creator.create_book(puzzle_dir)
\ No newline at end of file
+    asset_cache = AssetCache(dpi=asset_dpi) if asset_dpi else None
+    # An incremental build already caches every page, static ones included
+    with open_cache(TEMPLATE_DIR, TEMPLATE_CACHE_BYTES) if templates and page_cache is None \
+            else nullcontext() as template_cache:
+        with profiler.stage("render.assets"):
+            creator = SudokuBookCreator(output_filename, include_cover_text, background_images, invariant,
+                                        asset_cache, chunk_pages, render_workers, page_cache, template_cache,
+                                        compact)
+        if records is not None:
+            return creator.stream_book(records)
+        if manifest is None:
+            with profiler.stage("render.load"):
+                chain_path = os.path.join(puzzle_dir, CHAIN_FILENAME)
+                manifest = read_chain(chain_path) if os.path.exists(chain_path) else load_manifest(puzzle_dir)
+        with profiler.stage("render.pages"):
+            creator.create_book(manifest)
\ No newline at end of file
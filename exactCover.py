@@ -0,0 +1,126 @@
+import random
+from sudokuGrid import Grid, index_tables
+
+
+class ExactCoverSudoku:
+    """Algorithm X solver for Sudokus of any box size, from 4x4 up to 25x25."""
+
+    nodes = 0
+
+    def __init__(self, box=3):
+        self.box = box
+        self.size = box * box
+        size = self.size
+        cells = size * size
+        rows, cols, boxes = index_tables(size)[:3]
+        # Candidate i * size + d - 1 places digit d in cell i and covers four columns
+        self._covers = [(i, cells + rows[i] * size + d, 2 * cells + cols[i] * size + d,
+                         3 * cells + boxes[i] * size + d)
+                        for i in range(cells) for d in range(size)]
+        self._empty = [set() for _ in range(4 * cells)]
+        for candidate, covers in enumerate(self._covers):
+            for column in covers:
+                self._empty[column].add(candidate)
+
+    def _load(self, cells):
+        """Column sets of the matrix with the grid's givens selected, or None if they clash."""
+        columns = [set(members) for members in self._empty]
+        size = self.size
+        for i, value in enumerate(cells):
+            if not value:
+                continue
+            if value > size:
+                raise ValueError(f"Invalid value {value} at R{i // size + 1}C{i % size + 1}")
+            candidate = i * size + value - 1
+            if candidate not in columns[i]:
+                return None
+            self._select(columns, candidate)
+        return columns
+
+    def _select(self, columns, candidate):
+        """Cover every column of candidate and drop the candidates clashing with it; returns the undo list."""
+        removed = []
+        covers = self._covers
+        for column in covers[candidate]:
+            for other in columns[column]:
+                for other_column in covers[other]:
+                    if other_column != column:
+                        columns[other_column].discard(other)
+            removed.append((column, columns[column]))
+            columns[column] = None
+        return removed
+
+    def _deselect(self, columns, candidate, removed):
+        covers = self._covers
+        for column, members in reversed(removed):
+            columns[column] = members
+            for other in members:
+                for other_column in covers[other]:
+                    if other_column != column:
+                        columns[other_column].add(other)
+
+    def _search(self, columns, chosen, limit, solutions, rng):
+        self.nodes += 1
+        best = None
+        for members in columns:
+            if members is not None and (best is None or len(members) < len(best)):
+                best = members
+                if len(best) < 2:
+                    break
+        if best is None:
+            solutions.append(list(chosen))
+            return 1
+        if not best:
+            return 0
+
+        order = list(best)
+        if rng is not None:
+            rng.shuffle(order)
+        else:
+            order.sort()
+
+        found = 0
+        for candidate in order:
+            removed = self._select(columns, candidate)
+            chosen.append(candidate)
+            found += self._search(columns, chosen, limit - found, solutions, rng)
+            chosen.pop()
+            self._deselect(columns, candidate, removed)
+            if found >= limit:
+                break
+        return found
+
+    def _grid(self, cells, chosen):
+        values = bytearray(cells)
+        for candidate in chosen:
+            values[candidate // self.size] = candidate % self.size + 1
+        return Grid(values, self.size)
+
+    def fill(self, rng=random):
+        """Return a random solved Grid."""
+        size, box = self.size, self.box
+        cells = bytearray(size * size)
+        digits = list(range(1, size + 1))
+        rng.shuffle(digits)
+        for k, digit in enumerate(digits):
+            cells[(k // box) * size + k % box] = digit
+
+        solutions = []
+        self._search(self._load(cells), [], 1, solutions, rng)
+        return self._grid(cells, solutions[0])
+
+    def solve(self, grid):
+        """Return the solved Grid of a grid, or None if it has no solution."""
+        cells = Grid.coerce(grid).cells
+        columns = self._load(cells)
+        solutions = []
+        if columns is None or not self._search(columns, [], 1, solutions, None):
+            return None
+        return self._grid(cells, solutions[0])
+
+    def count_solutions(self, grid, limit=2):
+        """Count the solutions of the grid, stopping once limit is reached."""
+        columns = self._load(Grid.coerce(grid).cells)
+        if columns is None:
+            return 0
+        return self._search(columns, [], limit, [], None)
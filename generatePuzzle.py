@@ -1,14 +1,34 @@
+import hashlib
 import random
-from svgwrite import Drawing
-from svgwrite.container import Group
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from math import isqrt
+from sudokuSolver import BitmaskSolver
+from exactCover import ExactCoverSudoku
+from sudokuGrader import TechniqueGrader
+from sudokuGrid import Grid, PLACEHOLDER_BASE, index_tables
+from profiling import profiler
+from bookManifest import PuzzleRecord
 import os
 
+# Modules whose code decides the generated grids, hashed into cached puzzle keys
+GENERATOR_MODULES = ("generatePuzzle.py", "sudokuSolver.py", "exactCover.py", "gridFactory.py", "sudokuGrader.py")
+
 
 class SudokuGenerator:
-    def __init__(self, n_hints=20):
+    def __init__(self, n_hints=20, unique=False, dig_budget=200, grid_factory=None, box=3):
         self.n_hints = n_hints
-        self.size = 9
+        self.box = box
+        self.size = box * box
         self.grid = [[0 for _ in range(self.size)] for _ in range(self.size)]
+        self.unique = unique
+        self.dig_budget = dig_budget
+        self.uniqueness_checks = 0
+        self.fill_nodes = 0
+        self.solver_nodes = 0
+        self.grid_factory = grid_factory
 
     def is_valid(self, num, row, col):
         """Check if placing a number is valid."""
@@ -16,11 +36,11 @@ class SudokuGenerator:
             if self.grid[row][i] == num or self.grid[i][col] == num:
                 return False
 
-        box_start_row = row - row % 3
-        box_start_col = col - col % 3
+        box_start_row = row - row % self.box
+        box_start_col = col - col % self.box
 
-        for i in range(3):
-            for j in range(3):
+        for i in range(self.box):
+            for j in range(self.box):
                 if self.grid[box_start_row + i][box_start_col + j] == num:
                     return False
 
@@ -28,6 +48,7 @@ class SudokuGenerator:
 
     def fill_grid(self):
         """Fill the entire grid recursively."""
+        self.fill_nodes += 1
         for row in range(self.size):
             for col in range(self.size):
                 if self.grid[row][col] == 0:
@@ -46,52 +67,124 @@ class SudokuGenerator:
                     return False
         return True
 
+    def solver(self):
+        """Solver for this grid size: the bitmask solver for 9x9, exact cover for the rest."""
+        return BitmaskSolver() if self.box == 3 else ExactCoverSudoku(self.box)
+
+    def fill_solution(self):
+        """Fill self.grid with a solved Grid from the grid factory, or by search without one."""
+        if self.grid_factory is not None:
+            self.grid = self.grid_factory.next_grid()
+            return True
+        if self.box != 3:
+            engine = ExactCoverSudoku(self.box)
+            self.grid = engine.fill()
+            self.fill_nodes += engine.nodes
+            return True
+        filled = self.fill_grid()
+        self.grid = Grid.from_rows(self.grid)
+        return filled
+
     def remove_numbers(self):
-        """Remove numbers to create a puzzle with n hints."""
+        """Remove numbers from the solved Grid to create a puzzle with n hints."""
+        if self.unique:
+            self.dig_unique()
+            return
+
+        cells = self.grid.mutable()
         cells_to_remove = self.size ** 2 - self.n_hints
         while cells_to_remove > 0:
             row = random.randint(0, self.size - 1)
             col = random.randint(0, self.size - 1)
 
-            if self.grid[row][col] != 0:
-                self.grid[row][col] = 0
+            if cells[row * self.size + col] != 0:
+                cells[row * self.size + col] = 0
                 cells_to_remove -= 1
+        self.grid = Grid(cells)
+
+    def _dig_score(self, row, col, counts):
+        """Score a filled cell: cells in crowded rows, columns and boxes go first."""
+        row_counts, col_counts, box_counts = counts
+        box = (row // self.box) * self.box + col // self.box
+        return row_counts[row] + col_counts[col] + box_counts[box] + random.random()
+
+    def dig_unique(self):
+        """Remove numbers one at a time, keeping only removals that leave a unique solution."""
+        solver = self.solver()
+        best = None
+        self.uniqueness_checks = 0
+
+        while True:
+            cells = self.grid.mutable()
+            row_counts = [self.size] * self.size
+            col_counts = [self.size] * self.size
+            box_counts = [self.size] * self.size
+            remaining = [(row, col) for row in range(self.size) for col in range(self.size)]
+            hints = self.size ** 2
+
+            while hints > self.n_hints and remaining and self.uniqueness_checks < self.dig_budget:
+                counts = (row_counts, col_counts, box_counts)
+                index = max(range(len(remaining)),
+                            key=lambda k: self._dig_score(*remaining[k], counts))
+                row, col = remaining.pop(index)
+
+                value = cells[row * self.size + col]
+                cells[row * self.size + col] = 0
+                self.uniqueness_checks += 1
+                if solver.count_solutions(Grid(cells), 2) == 1:
+                    hints -= 1
+                    row_counts[row] -= 1
+                    col_counts[col] -= 1
+                    box_counts[(row // self.box) * self.box + col // self.box] -= 1
+                else:
+                    cells[row * self.size + col] = value
+
+            if best is None or hints < best[0]:
+                best = (hints, Grid(cells))
+            if hints <= self.n_hints or self.uniqueness_checks >= self.dig_budget:
+                break
+
+        self.grid = best[1]
+        self.solver_nodes += solver.nodes
+        return best[0]
 
     def generate_puzzle(self):
         """Generate a Sudoku puzzle."""
-        self.fill_grid()
+        self.fill_solution()
         self.remove_numbers()
         return self.grid
 
 
 class SolverSudoku:
     def solve(self, grid, row, col, num):
-        for x in range(9):
+        size = len(grid)
+        for x in range(size):
             if grid[row][x] == num:
                 return False
 
-        for x in range(9):
+        for x in range(size):
             if grid[x][col] == num:
                 return False
 
-        startRow = row - row % 3
-        startCol = col - col % 3
-        for i in range(3):
-            for j in range(3):
+        box = isqrt(size)
+        startRow = row - row % box
+        startCol = col - col % box
+        for i in range(box):
+            for j in range(box):
                 if grid[i + startRow][j + startCol] == num:
                     return False
         return True
 
     def Suduko(self, grid, row, col):
-
-        if (row == 9 - 1 and col == 9):
+        size = len(grid)
+        if (row == size - 1 and col == size):
             return True
-        if col == 9:
+        if col == size:
             row += 1
             col = 0
         if grid[row][col] > 0:
             return self.Suduko(grid, row, col + 1)
-        for num in range(1, 9 + 1):
+        for num in range(1, size + 1):
 
             if self.solve(grid, row, col, num):
 
@@ -103,104 +196,221 @@ class SolverSudoku:
 
 
 class EnhancedSudokuGenerator(SudokuGenerator):
-    def __init__(self, difficulty, puzzle_number, n_hints, n_placeholders=0, global_number=1):
-        super().__init__(n_hints)
+    def __init__(self, difficulty, puzzle_number, n_hints, n_placeholders=0, global_number=1,
+                 unique=False, dig_budget=200, grid_factory=None, write_svg=False, box=3):
+        super().__init__(n_hints, unique, dig_budget, grid_factory, box)
+        self.write_svg = write_svg
+        self.links = []
         self.difficulty = difficulty
         self.puzzle_number = puzzle_number
         self.n_placeholders = n_placeholders
         self.puzzle_folder = "puzzles"
         self.global_number = global_number
-        self.coordinates_file = f"{self.puzzle_folder}/{self.global_number}. {
-            self.difficulty}{self.puzzle_number}_coordinates.txt"
-
-    def update_coordinates_file(self, solution_grid):
-        """Create coordinates file for the current puzzle."""
-        os.makedirs(self.puzzle_folder, exist_ok=True)
-
-        coordinates_dict = {}
-        for num in range(1, 10):
-            coordinates = []
-            for i in range(9):
-                for j in range(9):
-                    if solution_grid[i][j] == num:
-                        coordinates.append(f"R{i+1}C{j+1}")
-            coordinates_dict[num] = coordinates
-
-        with open(self.coordinates_file, 'w') as f:
-            for num, coords in coordinates_dict.items():
-                random.shuffle(coords)
-                f.write(f"{num}: {', '.join(coords)}\n")
-
-    def generate_linked_puzzle(self):
-        """Generate a puzzle with placeholders if needed."""
-        self.fill_grid()
-        solution_grid = [row[:] for row in self.grid]
-
-        solution_filename = f"{
-            self.puzzle_folder}/{self.global_number}. {self.difficulty}{self.puzzle_number}S"
-        createPuzzleSvg(solution_filename, solution_grid)
-
-        self.update_coordinates_file(solution_grid)
-        self.remove_numbers()
-        puzzle_grid = [row[:] for row in self.grid]
-
-        if self.n_placeholders > 0 and self.puzzle_number > 1:
-            prev_coord_file = f"{self.puzzle_folder}/{self.global_number -
-                                                      1}. {self.difficulty}{self.puzzle_number-1}_coordinates.txt"
-
-            if os.path.exists(prev_coord_file):
-                placeholders = {}
-                available_numbers = []
-                used_values = set()
-
-                for i in range(9):
-                    for j in range(9):
-                        if puzzle_grid[i][j] != 0:
-                            available_numbers.append((puzzle_grid[i][j], i, j))
 
-                random.shuffle(available_numbers)
-
-                coord_mapping = {}
-                with open(prev_coord_file, 'r') as f:
-                    for line in f:
-                        if ': ' in line:
-                            num, coords = line.strip().split(': ')
-                            coord_mapping[int(num)] = coords.split(', ')
-
-                placeholder_idx = 0
-                for num, i, j in available_numbers:
-                    if placeholder_idx >= self.n_placeholders:
-                        break
-
-                    if num not in used_values and num in coord_mapping and coord_mapping[num]:
-                        placeholder = chr(97 + placeholder_idx)
-                        coord = random.choice(coord_mapping[num])
-                        placeholders[placeholder] = f"{coord} [={num}]"
-                        used_values.add(num)
-
-                        for x in range(9):
-                            for y in range(9):
-                                if puzzle_grid[x][y] == num:
-                                    puzzle_grid[x][y] = placeholder
-
-                        placeholder_idx += 1
-
-                with open(f"{self.puzzle_folder}/{self.global_number}. {self.difficulty}{self.puzzle_number}_placeholders.txt", 'w') as f:
-                    for placeholder, coord in placeholders.items():
-                        f.write(f"{placeholder} = {coord}\n")
-
-        puzzle_filename = f"{
-            self.puzzle_folder}/{self.global_number}. {self.difficulty}{self.puzzle_number}"
-        createPuzzleSvg(puzzle_filename, puzzle_grid)
+    def generate_grids(self):
+        """Fill a solution and dig the puzzle from it without writing any files."""
+        self.fill_solution()
+        solution_grid = self.grid
+        self.remove_numbers()
+        return self.grid, solution_grid
+
+    def select_placeholders(self, puzzle_grid, previous_solution):
+        """Choose the placeholder digits and the previous solution's cells they link to."""
+        size = self.size
+        cell_row, cell_col, cell_box = index_tables(size)[:3]
+        digit_boxes = [0] * (size + 1)
+        for index, code in enumerate(puzzle_grid.cells):
+            if code:
+                digit_boxes[code] |= 1 << cell_box[index]
+        source = [[0] * size for _ in range(size + 1)]
+        for index, code in enumerate(previous_solution.cells):
+            source[code][cell_box[index]] = index
+
+        digits = [num for num in range(1, size + 1) if digit_boxes[num]]
+        random.shuffle(digits)
+        free_boxes = list(range(size))
+        random.shuffle(free_boxes)
+
+        selected = []
+        covered = used_rows = used_cols = 0
+        while digits and len(selected) < self.n_placeholders:
+            num = max(digits, key=lambda digit: (digit_boxes[digit] & ~covered).bit_count())
+            digits.remove(num)
+            covered |= digit_boxes[num]
+
+            cell = min((source[num][box] for box in free_boxes),
+                       key=lambda i: (used_rows >> cell_row[i] & 1) + (used_cols >> cell_col[i] & 1))
+            free_boxes.remove(cell_box[cell])
+            used_rows |= 1 << cell_row[cell]
+            used_cols |= 1 << cell_col[cell]
+            selected.append((num, cell))
+        return selected
+
+    def link_puzzle(self, puzzle_grid, solution_grid, previous_solution=None):
+        """Replace digits with placeholders linked to the previous puzzle's solution."""
+        if self.n_placeholders > 0 and self.puzzle_number > 1 and previous_solution:
+            placeholders = {}
+            for num, cell in self.select_placeholders(puzzle_grid, previous_solution):
+                placeholders[num] = PLACEHOLDER_BASE + len(placeholders)
+                self.links.append((chr(placeholders[num]), cell // self.size + 1, cell % self.size + 1, num))
+
+            puzzle_grid = puzzle_grid.translate(placeholders)
+
+        if self.write_svg:
+            os.makedirs(self.puzzle_folder, exist_ok=True)
+            puzzle_filename = f"{
+                self.puzzle_folder}/{self.global_number}. {self.difficulty}{self.puzzle_number}"
+            createPuzzleSvg(puzzle_filename, puzzle_grid)
+            createPuzzleSvg(puzzle_filename + "S", solution_grid)
 
         return puzzle_grid, solution_grid
 
 
-def createPuzzleSet(difficulty_level, num_puzzles, num_hints, num_placeholders=0, start_number=1, global_start=1):
-    """Create a set of puzzles for a specific difficulty level."""
+def derive_seed(*parts):
+    """Derive a 32-bit seed from a master seed and puzzle identifiers."""
+    return random.Random(":".join(str(part) for part in parts)).getrandbits(32)
+
+
+_worker_grid_factory = None
+
+
+def generator_digest():
+    """Hash of the source of every module in GENERATOR_MODULES."""
+    digest = hashlib.sha256()
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in GENERATOR_MODULES:
+        with open(os.path.join(module_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _init_worker(grid_factory):
+    global _worker_grid_factory
+    _worker_grid_factory = grid_factory
+
+
+def _generate_grids_job(job):
+    """Generate one puzzle's Grids in a worker process."""
+    n_hints, unique, dig_budget, seed, grade_band, grade_attempts, box = job
+    wall, cpu = time.perf_counter(), time.process_time()
+    grader = TechniqueGrader() if grade_band else None
+    stats = {"attempts": 0, "fill_nodes": 0, "solver_nodes": 0}
+    best = None
+    for attempt in range(grade_attempts if grade_band else 1):
+        random.seed(seed if attempt == 0 else derive_seed(seed, "grade", attempt))
+        generator = SudokuGenerator(n_hints, unique, dig_budget, _worker_grid_factory, box)
+        generator.fill_solution()
+        solution_grid = generator.grid
+        generator.remove_numbers()
+        stats["attempts"] += 1
+        stats["fill_nodes"] += generator.fill_nodes
+        stats["solver_nodes"] += generator.solver_nodes
+        grade = grader.grade(generator.grid) if grader else None
+        result = (generator.grid, solution_grid, generator.uniqueness_checks, grade)
+        if grader is None:
+            best = (0, result)
+            break
+
+        distance = max(grade_band[0] - grade[0], grade[0] - grade_band[1], 0)
+        if best is None or distance < best[0]:
+            best = (distance, result)
+        if not distance:
+            break
+
+    stats["wall_s"] = round(time.perf_counter() - wall, 6)
+    stats["cpu_s"] = round(time.process_time() - cpu, 6)
+    return best[1] + (stats,)
+
+
+def _encode_result(result):
+    """JSON form of a _generate_grids_job result for the build cache."""
+    puzzle_grid, solution_grid, uniqueness_checks, grade, stats = result
+    return {"grid": puzzle_grid.cells.hex(), "solution": solution_grid.cells.hex(),
+            "uniqueness_checks": uniqueness_checks, "grade": grade, "stats": stats}
+
+
+def _decode_result(data):
+    grade = tuple(data["grade"]) if data["grade"] else None
+    return (Grid(bytes.fromhex(data["grid"])), Grid(bytes.fromhex(data["solution"])),
+            data["uniqueness_checks"], grade, dict(data["stats"], cached=True))
+
+
+def _cached_results(jobs, keys, build_cache, compute):
+    """Results of jobs in order, computing only those missing from the build cache."""
+    cached = [build_cache.get_json("puzzles", key) for key in keys]
+    computed = compute([job for job, data in zip(jobs, cached) if data is None])
+    for key, data in zip(keys, cached):
+        if data is None:
+            result = next(computed)
+            build_cache.put_json("puzzles", key, _encode_result(result))
+            yield result
+        else:
+            yield _decode_result(data)
+
+
+def _bounded_map(executor, func, items, window):
+    """executor.map that keeps at most window jobs submitted ahead of the consumer."""
+    items = iter(items)
+    pending = deque(executor.submit(func, item) for item in islice(items, window))
+    while pending:
+        result = pending.popleft().result()
+        for item in islice(items, 1):
+            pending.append(executor.submit(func, item))
+        yield result
+
+
+def createPuzzleExecutor(workers, grid_factory=None):
+    """Create a process pool for createPuzzleSet, sharing the grid factory's seed pool."""
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(grid_factory,))
+
+
+def createPuzzleSet(difficulty_level, num_puzzles, num_hints, num_placeholders=0, start_number=1, global_start=1,
+                    unique=False, dig_budget=200, grid_factory=None, seed=None, executor=None,
+                    write_svg=False, manifest=None, grade_band=None, grade_attempts=20, drawn=None,
+                    build_cache=None, box=3):
+    """Create a set of puzzles for a specific difficulty level; see streamPuzzleSet."""
+    return list(streamPuzzleSet(difficulty_level, num_puzzles, num_hints, num_placeholders, start_number,
+                                global_start, unique, dig_budget, grid_factory, seed, executor, write_svg,
+                                manifest, grade_band, grade_attempts, drawn, build_cache, box))
+
+
+def streamPuzzleSet(difficulty_level, num_puzzles, num_hints, num_placeholders=0, start_number=1, global_start=1,
+                    unique=False, dig_budget=200, grid_factory=None, seed=None, executor=None,
+                    write_svg=False, manifest=None, grade_band=None, grade_attempts=20, drawn=None,
+                    build_cache=None, box=3, window=64):
+    """Create a set of puzzles for a specific difficulty level, yielding each record once it is linked."""
     os.makedirs("puzzles", exist_ok=True)
 
-    for i in range(num_puzzles):
+    if seed is None:
+        seed = random.getrandbits(32)
+    seeds = [derive_seed(seed, difficulty_level, start_number + i) for i in range(num_puzzles)]
+    jobs = [(num_hints, unique, dig_budget, puzzle_seed, grade_band, grade_attempts, box) for puzzle_seed in seeds]
+
+    if drawn is not None:
+        no_stats = {"attempts": 0, "fill_nodes": 0, "solver_nodes": 0, "wall_s": 0, "cpu_s": 0}
+        results = [(grid, solution, 0, grade, no_stats) for grid, solution, grade in drawn]
+    else:
+        if executor is None:
+            _init_worker(grid_factory)
+            compute = lambda pending: map(_generate_grids_job, pending)
+        else:
+            compute = lambda pending: _bounded_map(executor, _generate_grids_job, pending, window)
+
+        if build_cache is None:
+            results = compute(jobs)
+        else:
+            # Solutions depend on the exact seed grids, or on plain backtracking without a factory
+            fill = hashlib.sha256(b"".join(grid.cells for grid in grid_factory.seed_grids)).hexdigest() \
+                if grid_factory is not None else "backtrack"
+            code = generator_digest()
+            keys = [build_cache.key(seed, difficulty_level, start_number + i, fill, code, job)
+                    for i, job in enumerate(jobs)]
+            results = _cached_results(jobs, keys, build_cache, compute)
+
+    in_band = 0
+    previous_solution = None
+    for i, (puzzle_grid, solution_grid, uniqueness_checks, grade, stats) in enumerate(results):
         puzzle_number = start_number + i
         global_number = global_start + i
         generator = EnhancedSudokuGenerator(
@@ -208,12 +418,45 @@ def createPuzzleSet(difficulty_level, num_puzzles, num_hints, num_placeholders=0
             puzzle_number=puzzle_number,
             n_hints=num_hints,
             n_placeholders=num_placeholders,
-            global_number=global_number
+            global_number=global_number,
+            unique=unique,
+            dig_budget=dig_budget,
+            grid_factory=grid_factory,
+            write_svg=write_svg,
+            box=box
         )
-        puzzle_grid, solution_grid = generator.generate_linked_puzzle()
+        random.seed(derive_seed(seeds[i], "link"))
+        puzzle_grid, solution_grid = generator.link_puzzle(puzzle_grid, solution_grid, previous_solution)
+        previous_solution = solution_grid
+
+        record = PuzzleRecord(f"{difficulty_level}{puzzle_number}", difficulty_level, global_number,
+                              puzzle_grid, solution_grid, generator.links, grade)
+        if grade_band and grade_band[0] <= grade[0] <= grade_band[1]:
+            in_band += 1
+        if manifest is not None:
+            manifest.add(record)
+        profiler.puzzle(record.puzzle_id, dict(stats, uniqueness_checks=uniqueness_checks))
+
+        if unique:
+            hints = puzzle_grid.hints()
+            summary = f"  {difficulty_level}{puzzle_number}: {hints} hints"
+            if drawn is None:
+                summary += f", {uniqueness_checks} uniqueness checks"
+            if grade:
+                summary += f", {grade[1]} ({grade[0]})"
+            print(summary)
+        yield record
+
+    if grade_band:
+        print(f"  {difficulty_level}: {in_band}/{num_puzzles} puzzles graded "
+              f"{grade_band[0]}-{grade_band[1]}")
 
 
 def createPuzzleSvg(filename="Puzzle", grid=[]):
+    # svgwrite is only needed with --svg, so plain generate runs do not import it
+    from svgwrite import Drawing
+    from svgwrite.container import Group
+
     filename = filename if filename.endswith(".svg") else filename + ".svg"
 
     grid_size = len(grid)
@@ -240,8 +483,9 @@ def createPuzzleSvg(filename="Puzzle", grid=[]):
             grid_group.add(dwg.rect(insert=(cell_x, cell_y), size=(
                 cell_size, cell_size), fill='none', stroke='black', stroke_width=1))
 
+    box = isqrt(grid_size)
     for i in range(1, grid_size):
-        if i % 3 == 0:
+        if i % box == 0:
             # Horizontal line
             y = i * cell_size
             dwg.add(dwg.line(start=(0, y), end=(grid_width, y),
@@ -258,11 +502,12 @@ def createPuzzleSvg(filename="Puzzle", grid=[]):
         grid_width, grid_height), fill='none', stroke='red', stroke_width=grid_outline_width))
 
     dwg.save()
+    profiler.count("files.written")
 
 
 def displayGrid(grid):
-    for i in range(9):
-        for j in range(9):
+    for i in range(len(grid)):
+        for j in range(len(grid)):
             print(grid[i][j], end=" ")
         print()
 
@@ -271,16 +516,17 @@ if __name__ == "__main__":
     # Minimum number of hints required to have a unique solution to a Sudoku puzzle is 17, so n_hints should always be>= 17
     n_hints = 20
     sudoku = SudokuGenerator(n_hints)
-    solver = SolverSudoku()
+    solver = BitmaskSolver()
     grid = sudoku.generate_puzzle()
 
     print('\n', '*'*5, 'PUZZLE GRID', '*'*5)
     displayGrid(grid)
     createPuzzleSvg("Puzzle", grid)
 
-    if (solver.Suduko(grid, 0, 0)):
+    solution = solver.solve(grid)
+    if solution:
         print('\n', '*'*5, 'SOLUTION', '*'*5)
-        displayGrid(grid)
-        createPuzzleSvg("Solution", grid)
+        displayGrid(solution)
+        createPuzzleSvg("Solution", solution)
     else:
         print("No Solution exist:(")
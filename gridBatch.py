@@ -0,0 +1,72 @@
+import numpy as np
+from sudokuGrid import Grid
+
+# Number of set bits in every 9-bit digit mask
+POPCOUNT = np.array([bin(mask).count("1") for mask in range(512)], dtype=np.uint8)
+ALL_DIGITS = 0x1FF
+
+
+def _line_orders(rng, count):
+    """Random row (or column) orders for count grids that keep bands intact."""
+    bands = np.argsort(rng.random((count, 3)), axis=1)
+    within = np.argsort(rng.random((count, 3, 3)), axis=2)
+    return (bands[:, :, None] * 3 + within).reshape(count, 9)
+
+
+class GridBatch:
+    """K Sudoku grids held as one (K, 9, 9) uint8 array, blanks stored as 0."""
+
+    def __init__(self, grids):
+        self.grids = np.asarray(grids, dtype=np.uint8).reshape(-1, 9, 9)
+
+    def __len__(self):
+        return len(self.grids)
+
+    def __getitem__(self, index):
+        return Grid(self.grids[index].tobytes(), 9)
+
+    @classmethod
+    def generate(cls, seed_grids, count, seed=None):
+        """Transform randomly chosen seed grids into count solved grids."""
+        rng = np.random.default_rng(seed)
+        seeds = np.frombuffer(b"".join(Grid.coerce(grid).cells for grid in seed_grids),
+                              dtype=np.uint8).reshape(-1, 9, 9)
+        grids = seeds[rng.integers(len(seeds), size=count)]
+
+        transpose = rng.random(count) < 0.5
+        grids[transpose] = grids[transpose].transpose(0, 2, 1)
+        grids = np.take_along_axis(grids, _line_orders(rng, count)[:, :, None], axis=1)
+        grids = np.take_along_axis(grids, _line_orders(rng, count)[:, None, :], axis=2)
+
+        relabel = np.zeros((count, 10), dtype=np.uint8)
+        relabel[:, 1:] = np.argsort(rng.random((count, 9)), axis=1) + 1
+        grids = np.take_along_axis(relabel, grids.reshape(count, 81).astype(np.intp), axis=1)
+        return cls(grids)
+
+    def units(self):
+        """(K, 27, 9) view of every row, column and box of every grid."""
+        count = len(self.grids)
+        boxes = self.grids.reshape(count, 3, 3, 3, 3).transpose(0, 1, 3, 2, 4).reshape(count, 9, 9)
+        return np.concatenate((self.grids, self.grids.transpose(0, 2, 1), boxes), axis=1)
+
+    def _unit_masks(self):
+        units = self.units()
+        # Digit d becomes bit d - 1; blanks shift down to 0
+        bits = np.left_shift(np.uint16(1), units, dtype=np.uint16) >> 1
+        return np.bitwise_or.reduce(bits, axis=2), np.count_nonzero(units, axis=2)
+
+    def consistent(self):
+        """Boolean array: True where no row, column or box repeats a digit."""
+        masks, filled = self._unit_masks()
+        return (POPCOUNT[masks] == filled).all(axis=1)
+
+    def solved(self):
+        """Boolean array: True where every row, column and box holds all nine digits."""
+        masks, _ = self._unit_masks()
+        return (masks == ALL_DIGITS).all(axis=1)
+
+    def coordinate_maps(self):
+        """(K, 9, 9, 2) array of the 1-based (row, col) cells of each digit, in row-major order; solved grids only."""
+        count = len(self.grids)
+        positions = np.argsort(self.grids.reshape(count, 81), axis=1, kind="stable").reshape(count, 9, 9)
+        return np.stack((positions // 9 + 1, positions % 9 + 1), axis=-1).astype(np.uint8)
@@ -0,0 +1,51 @@
+import random
+from sudokuGrid import Grid
+
+
+class GridFactory:
+    """Produce solved grids by applying validity-preserving transforms to seed grids."""
+
+    def __init__(self, pool_size=4, seed_grids=None):
+        # Backtracking nodes spent filling the seed grids, for --profile
+        self.fill_nodes = 0
+        if seed_grids is None:
+            from generatePuzzle import SudokuGenerator
+
+            seed_grids = []
+            for _ in range(pool_size):
+                generator = SudokuGenerator()
+                generator.fill_grid()
+                seed_grids.append(generator.grid)
+                self.fill_nodes += generator.fill_nodes
+
+        if not seed_grids:
+            raise ValueError("Grid factory needs at least one seed grid.")
+        self.seed_grids = [Grid.coerce(grid) for grid in seed_grids]
+
+    def _line_order(self):
+        """Random order of the 9 rows (or columns) that keeps bands intact."""
+        bands = [0, 1, 2]
+        random.shuffle(bands)
+        order = []
+        for band in bands:
+            lines = [band * 3, band * 3 + 1, band * 3 + 2]
+            random.shuffle(lines)
+            order.extend(lines)
+        return order
+
+    def next_grid(self):
+        """Return a new solved Grid."""
+        seed = random.choice(self.seed_grids).cells
+
+        digits = list(range(1, 10))
+        random.shuffle(digits)
+        relabel = [0] + digits
+
+        rows = self._line_order()
+        cols = self._line_order()
+
+        if random.random() < 0.5:
+            order = [c * 9 + r for r in rows for c in cols]
+        else:
+            order = [r * 9 + c for r in rows for c in cols]
+        return Grid(bytes(relabel[seed[i]] for i in order), 9)
@@ -1,11 +1,53 @@
 import argparse
-from generatePuzzle import createPuzzleSet
-from createBook import create_sudoku_book
+from contextlib import nullcontext
+from profiling import profiler, peak_rss_mb
 import os
+import random
 import shutil
+import sys
 
+# Modules are imported by the functions that use them, so that each
+# subcommand only loads what it needs; reportlab and numpy alone take
+# longer to import than a small generate job takes to run.
+COMMANDS = ("generate", "render", "verify", "bench")
 
-def validate_arguments(args):
+BACKGROUND_IMAGES = {
+    'cover': "Assets/Cover.png",
+    'index': "Assets/Index.png",
+    'instructions': "Assets/Instructions.png",
+    'transition': "Assets/Transition.png",
+    'puzzle': "Assets/PageBackground.jpg",
+    'solutions': "Assets/PageBackground.jpg"
+}
+
+
+def validate_arguments(args, command=None):
+    """Check the arguments of the full pipeline, or of the generate or render subcommand."""
+    if args.cache_size < 1:
+        raise ValueError("The build cache needs at least 1 MB.")
+
+    if command != "generate":
+        validate_render_arguments(args)
+    if command != "render":
+        validate_generation_arguments(args)
+
+    if command is None and args.pipeline and (args.verify or args.incremental):
+        raise ValueError("--pipeline renders pages before the chain is complete, "
+                         "so it cannot be combined with --verify or --incremental.")
+
+
+def validate_render_arguments(args):
+    if args.asset_dpi < 0:
+        raise ValueError("Asset DPI cannot be negative.")
+
+    if args.chunk_pages < 0:
+        raise ValueError("Chunk size cannot be negative.")
+
+    if args.render_workers < 1:
+        raise ValueError("At least one worker is required.")
+
+
+def validate_generation_arguments(args):
     if any(count < 1 for count in [args.easy, args.medium, args.advanced, args.grandmaster]):
         raise ValueError("Each difficulty mode must have at least one puzzle.")
     
@@ -13,29 +55,84 @@ def validate_arguments(args):
                                    args.advanced_hints, args.grandmaster_hints]):
         raise ValueError("Each mode must have at least 18 hints for puzzle validity.")
 
+    if args.dig_budget < 1:
+        raise ValueError("Dig budget must allow at least one removal attempt.")
+
+    if args.grade_attempts < 1:
+        raise ValueError("Grading needs at least one attempt per puzzle.")
+
+    if args.workers < 1:
+        raise ValueError("At least one worker is required.")
+
+    if args.box_size != 3 and (args.grade or args.from_bank):
+        raise ValueError("Grading and puzzle banks are only available for 9x9 books.")
+
+
+def scaled_count(count, box):
+    """Hint count or dig budget for a box * box grid from one given for 9x9, scaled by cell count."""
+    return count if box == 3 else max(round(count * box ** 4 / 81), 1)
 
-def generate_puzzle_sets(args):
+
+def stream_puzzle_sets(args, build_cache=None):
+    """Yield the records of every mode in book order as soon as each is linked."""
+    from generatePuzzle import streamPuzzleSet, createPuzzleExecutor
+    from gridFactory import GridFactory
+    from sudokuGrader import DIFFICULTY_BANDS
+
+    box = args.box_size
     difficulty_configs = {
-        'E': (args.easy, args.easy_hints, 3),
-        'M': (args.medium, args.medium_hints, 5),
-        'A': (args.advanced, args.advanced_hints, 7),
-        'G': (args.grandmaster, args.grandmaster_hints, 9)
+        'E': (args.easy, scaled_count(args.easy_hints, box), 3),
+        'M': (args.medium, scaled_count(args.medium_hints, box), 5),
+        'A': (args.advanced, scaled_count(args.advanced_hints, box), 7),
+        'G': (args.grandmaster, scaled_count(args.grandmaster_hints, box), 9)
     }
 
-    global_counter = 1
-    for mode, (count, hints, placeholders) in difficulty_configs.items():
-        if count > 0:
-            createPuzzleSet(mode, count, hints, placeholders, 
-                          start_number=1, global_start=global_counter)
-            global_counter += count
+    random.seed(args.seed)
+    bank = None
+    if args.from_bank:
+        from puzzleBank import PuzzleBank
+        bank = PuzzleBank(args.from_bank)
+    grid_factory = None if args.backtrack_fill or bank or box != 3 else GridFactory()
+    if grid_factory is not None:
+        profiler.count("fill_grid.nodes", grid_factory.fill_nodes)
 
+    executor = createPuzzleExecutor(args.workers, grid_factory) if args.workers > 1 and not bank else None
+    with bank or nullcontext(), executor or nullcontext():
+        global_counter = 1
+        for mode, (count, hints, placeholders) in difficulty_configs.items():
+            if count > 0:
+                grade_band = DIFFICULTY_BANDS[mode] if args.grade else None
+                with profiler.stage(f"generate.{mode}"):
+                    drawn = bank.draw(count, hints, grade_band) if bank else None
+                    yield from streamPuzzleSet(mode, count, hints, placeholders,
+                                               start_number=1, global_start=global_counter,
+                                               unique=args.unique, dig_budget=scaled_count(args.dig_budget, box),
+                                               grid_factory=grid_factory, seed=args.seed,
+                                               executor=executor, write_svg=args.svg,
+                                               grade_band=grade_band, grade_attempts=args.grade_attempts,
+                                               drawn=drawn, build_cache=build_cache, box=box)
+                global_counter += count
+        if bank:
+            bank.save_usage()
 
-def main():
-    parser = argparse.ArgumentParser(description="Create a book of linked Sudoku puzzles.")
-    
-    parser.add_argument("-n", "--name", type=str, default="LEAP",
-                       help="Name of the book")
-    
+
+def write_chain_files(args, manifest):
+    from chainFile import CHAIN_FILENAME, write_chain
+
+    json_path = os.path.join("puzzles", "chain.json") if args.json else None
+    with profiler.stage("write_chain"):
+        write_chain(os.path.join("puzzles", CHAIN_FILENAME), manifest, json_path)
+
+
+def generate_puzzle_sets(args, build_cache=None):
+    from bookManifest import BookManifest
+
+    manifest = BookManifest(stream_puzzle_sets(args, build_cache))
+    write_chain_files(args, manifest)
+    return manifest
+
+
+def add_generation_arguments(parser):
     difficulty_args = [
         ("-e", "--easy", 15, "Number of easy mode puzzles"),
         ("-m", "--medium", 10, "Number of medium mode puzzles"),
@@ -56,37 +153,201 @@ def main():
     for short_opt, long_opt, default, help_text in hint_args:
         parser.add_argument(short_opt, long_opt, type=int, default=default, help=help_text)
     
-    parser.add_argument("-d", "--delete", action="store_true", default=False,
-                       help="Delete puzzles after book creation")
+    parser.add_argument("-u", "--unique", action="store_true", default=False,
+                       help="Only remove numbers that keep the solution unique")
+    parser.add_argument("--grade", action="store_true", default=False,
+                       help="Fill each mode by graded solving difficulty (implies --unique)")
+    parser.add_argument("--grade-attempts", type=int, default=20,
+                       help="Puzzles tried per slot to hit the mode's difficulty band")
+    parser.add_argument("--from-bank", type=str, default=None, metavar="BANK",
+                       help="Draw unused puzzles from a puzzle bank instead of generating them")
+    parser.add_argument("--box-size", type=int, choices=[2, 3, 4, 5], default=3,
+                       help="Box size: 2, 3, 4 or 5 for 4x4, 9x9, 16x16 or 25x25 grids "
+                            "(hint counts are given for 9x9 and scaled by cell count)")
+    parser.add_argument("--dig-budget", type=int, default=200,
+                       help="Maximum removal attempts per puzzle in unique mode, given for 9x9 "
+                            "and scaled by cell count like the hints")
+    parser.add_argument("--backtrack-fill", action="store_true", default=False,
+                       help="Fill every solution grid by backtracking instead of the grid factory")
+    parser.add_argument("--svg", action="store_true", default=False,
+                       help="Also export every puzzle and solution grid as SVG")
+    parser.add_argument("--json", action="store_true", default=False,
+                       help="Also write the puzzle chain as JSON")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                       help="Number of processes used to generate puzzles")
+    parser.add_argument("-s", "--seed", type=int, default=None,
+                       help="Master seed; the same seed gives the same book for any worker count")
+    parser.add_argument("--verify", action="store_true", default=False,
+                       help="Replay the finished chain and stop before rendering if any link is broken")
+
+
+def add_render_arguments(parser):
+    parser.add_argument("-n", "--name", type=str, default="LEAP",
+                       help="Name of the book")
     parser.add_argument("-ct", "--cover-text", action="store_true", default=False,
                        help="Add text in the cover page")
+    parser.add_argument("--asset-dpi", type=int, default=150,
+                       help="Resample background images to this DPI (0 keeps the originals)")
+    parser.add_argument("--chunk-pages", type=int, default=0,
+                       help="Render the PDF in chunks of this many pages to bound memory (0 renders in one pass)")
+    parser.add_argument("--render-workers", type=int, default=1,
+                       help="Number of processes used to render PDF pages")
+    parser.add_argument("--no-templates", action="store_true", default=False,
+                       help="Lay out the cover, instructions and transition pages instead of "
+                            "stamping in their cached templates")
+    parser.add_argument("--compact", action="store_true", default=False,
+                       help="Write a smaller PDF 1.5 file: binary streams, only the resources each page "
+                            "uses and compressed object streams; reports the size of each section")
+
+
+def add_build_arguments(parser):
+    parser.add_argument("--incremental", action="store_true", default=False,
+                       help="Reuse puzzles and pages from earlier builds whose inputs have not changed")
+    parser.add_argument("--cache-dir", type=str, default=".leap_cache/build",
+                       help="Directory of the --incremental build cache")
+    parser.add_argument("--cache-size", type=int, default=512,
+                       help="Size limit of the build cache in MB; least recently used entries are evicted")
+    parser.add_argument("--profile", type=str, nargs="?", const="profile.json", default=None, metavar="FILE",
+                       help="Write a JSON timing and counter report (default file: profile.json)")
+    parser.add_argument("--cprofile", type=str, default=None, metavar="FILE",
+                       help="With --profile, also dump cProfile statistics to this file")
+
+
+def build_parser(command=None):
+    """Parser of the full pipeline, or of the generate or render subcommand."""
+    if command == "generate":
+        parser = argparse.ArgumentParser(prog="main.py generate",
+                                         description="Generate the puzzle chain into puzzles/.")
+        add_generation_arguments(parser)
+    elif command == "render":
+        parser = argparse.ArgumentParser(prog="main.py render",
+                                         description="Render the book from the chain in puzzles/.")
+        add_render_arguments(parser)
+        parser.add_argument("--invariant", action="store_true", default=False,
+                           help="Leave timestamps out so the same chain gives a byte-identical PDF")
+    else:
+        parser = argparse.ArgumentParser(
+            description="Create a book of linked Sudoku puzzles.",
+            epilog="Subcommands: generate, render, verify and bench run one stage each; "
+                   "see main.py <subcommand> -h.")
+        add_render_arguments(parser)
+        add_generation_arguments(parser)
+        parser.add_argument("-d", "--delete", action="store_true", default=False,
+                           help="Delete puzzles after book creation")
+        parser.add_argument("--pipeline", action="store_true", default=False,
+                           help="Render pages in --render-workers processes while the puzzles are still "
+                                "being generated")
+    add_build_arguments(parser)
+    return parser
+
+
+def prepare_generation(args):
+    # Puzzles with several solutions cannot be finished by logic alone
+    args.unique = args.unique or args.grade
+    os.makedirs("puzzles", exist_ok=True)
+
+    print(f"Seed: {args.seed}\n")
+
+
+def generate_stage(args, build_cache):
+    """Generate, write and optionally verify the chain; returns the manifest."""
+    prepare_generation(args)
+
+    print("Generating puzzle sets...")
+    with profiler.stage("generate"):
+        manifest = generate_puzzle_sets(args, build_cache)
+    if build_cache and not args.from_bank:
+        print(f"  Puzzles: {build_cache.hits.get('puzzles', 0)} cached, "
+              f"{build_cache.misses.get('puzzles', 0)} generated")
+    print("Puzzle generation completed successfully.\n")
+
+    if args.verify:
+        from verifyChain import verify_chain
+
+        print("Verifying puzzle chain...")
+        with profiler.stage("verify"):
+            verified = verify_chain(manifest, args.unique, args.workers)
+        print(f"All {verified} puzzles solve in order.\n")
+    return manifest
+
 
-    args = parser.parse_args()
+def render_stage(args, manifest, invariant, build_cache):
+    """Render the book, from the manifest or else from the chain in puzzles/."""
+    from createBook import create_sudoku_book
+
+    print("Creating puzzle book...")
+    with profiler.stage("render"):
+        create_sudoku_book("puzzles", args.name, BACKGROUND_IMAGES, args.cover_text,
+                           invariant=invariant, asset_dpi=args.asset_dpi, manifest=manifest,
+                           chunk_pages=args.chunk_pages, render_workers=args.render_workers,
+                           page_cache=build_cache, templates=not args.no_templates, compact=args.compact)
+    print("Book creation completed successfully.")
+
+
+def pipeline_stage(args, invariant):
+    """Generate the chain and render the book at once, each page as soon as its puzzles are linked."""
+    from createBook import create_sudoku_book
+
+    prepare_generation(args)
+
+    print("Generating puzzles and creating puzzle book...")
+    with profiler.stage("pipeline"):
+        manifest = create_sudoku_book("puzzles", args.name, BACKGROUND_IMAGES, args.cover_text,
+                                      invariant=invariant, asset_dpi=args.asset_dpi,
+                                      chunk_pages=args.chunk_pages, render_workers=args.render_workers,
+                                      templates=not args.no_templates, compact=args.compact,
+                                      records=stream_puzzle_sets(args))
+        write_chain_files(args, manifest)
+    print("Book creation completed successfully.")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv and argv[0] in COMMANDS else None
+    if command == "verify":
+        import verifyChain
+        return verifyChain.main(argv[1:], prog="main.py verify")
+    if command == "bench":
+        import benchmark
+        return benchmark.main(argv[1:], prog="main.py bench")
+
+    args = build_parser(command).parse_args(argv[1:] if command else argv)
+    if args.profile:
+        profiler.enable(cprofile=bool(args.cprofile))
 
     try:
         print("\nInitializing LEAP puzzle book generation...\n")
         
-        validate_arguments(args)
-        os.makedirs("puzzles", exist_ok=True)
-        
-        print("Generating puzzle sets...")
-        generate_puzzle_sets(args)
-        print("Puzzle generation completed successfully.\n")
-        
-        print("Creating puzzle book...")
-        background_images = {
-            'cover': "Assets/Cover.png",
-            'index': "Assets/Index.png",
-            'instructions': "Assets/Instructions.png",
-            'transition': "Assets/Transition.png",
-            'puzzle': "Assets/PageBackground.jpg",
-            'solutions': "Assets/PageBackground.jpg"
-        }
-        
-        create_sudoku_book("puzzles", args.name, background_images, args.cover_text)
-        print("Book creation completed successfully.\n")
+        validate_arguments(args, command)
+        build_cache = nullcontext()
+        if args.incremental:
+            from buildCache import open_cache
+            build_cache = open_cache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+        manifest = None
+        invariant = command == "render" and args.invariant
+        if command != "render":
+            invariant = args.seed is not None
+            if not invariant:
+                args.seed = random.randrange(2 ** 32)
+                if args.incremental:
+                    print("Warning: --incremental without --seed draws a new seed, "
+                          "so no cached puzzles or puzzle pages can be reused.\n")
+
+        with build_cache as build_cache:
+            if command is None and args.pipeline:
+                pipeline_stage(args, invariant)
+            else:
+                if command != "render":
+                    manifest = generate_stage(args, build_cache)
+                if command != "generate":
+                    render_stage(args, manifest, invariant, build_cache)
+        peak_rss = peak_rss_mb()
+        if peak_rss is not None:
+            print(f"Peak RSS: {peak_rss:.1f} MB")
+        print()
         
-        if args.delete:
+        if command is None and args.delete:
             print("Cleaning up temporary files...")
             shutil.rmtree("puzzles")
             print("Cleanup completed successfully.\n")
@@ -95,11 +356,17 @@ def main():
         
     except Exception as e:
         print(f"\nError: {str(e)}")
-        shutil.rmtree("puzzles", ignore_errors=True)
+        if command != "render":
+            shutil.rmtree("puzzles", ignore_errors=True)
         return 1
+
+    finally:
+        if args.profile:
+            profiler.write(args.profile, args.cprofile)
+            print(f"Profile written to {args.profile}")
     
     return 0
 
 
 if __name__ == "__main__":
-    exit(main())
\ No newline at end of file
+    exit(main())
@@ -0,0 +1,378 @@
+import base64
+import hashlib
+import os
+import re
+import struct
+import time
+import zlib
+from profiling import profiler
+
+OBJ_HEADER = re.compile(rb'(\d+) (\d+) obj\s*')
+REF = re.compile(rb'(\d+) 0 R\b')
+STREAM_KEYWORD = re.compile(rb'\s*stream\r?\n')
+LENGTH = re.compile(rb'/Length (\d+)\b(?! \d+ R)')
+PAGE_TYPE = re.compile(rb'/Type\s*/Page\b')
+PARENT = re.compile(rb'/Parent \d+ 0 R')
+KIDS = re.compile(rb'/Kids\s*\[([^\]]*)\]')
+DICT_TOKEN = re.compile(rb'<<|>>|[(<]')
+FILTER = re.compile(rb'/Filter\s*(\[[^\]]*\]|/\w+)')
+CONTENTS = re.compile(rb'/Contents\s*(\[[^\]]*\]|\d+ 0 R)')
+FORM_TYPE = re.compile(rb'/Subtype\s*/Form\b')
+RESOURCES = re.compile(rb'/Resources\s*(?=<<)')
+RESOURCE_KEY = re.compile(rb'/(\w+)\s*')
+SPACE = re.compile(rb'\s*')
+INDIRECT = re.compile(rb'(\d+) 0 R')
+NAMED_REF = re.compile(rb'/([^\s/\[\]()<>{}%]+)\s+(\d+ 0 R)')
+NAME = re.compile(rb'/([^\s/\[\]()<>{}%]+)')
+# Page entries that only restate the defaults
+DEFAULT_ENTRIES = re.compile(rb'/Rotate 0\b|/Trans\s*<<\s*>>')
+INFO_DATE = re.compile(rb'/(CreationDate|ModDate) \([^)]*\)')
+# Objects packed into each compressed object stream in compact mode
+OBJECT_STREAM_SIZE = 200
+
+
+def _string_end(data, pos):
+    """Index just past the literal string starting at data[pos] == '('."""
+    depth = 0
+    i = pos
+    while True:
+        c = data[i]
+        if c == 0x5C:  # backslash escapes the next byte
+            i += 2
+            continue
+        if c == 0x28:
+            depth += 1
+        elif c == 0x29:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+
+
+def _dict_end(data, pos):
+    """Index just past the dictionary starting at data[pos] == '<<'."""
+    depth = 0
+    i = pos
+    while True:
+        # Jump straight to the next delimiter instead of stepping byte by byte
+        token = DICT_TOKEN.search(data, i)
+        i = token.end()
+        if token.group() == b'<<':
+            depth += 1
+        elif token.group() == b'>>':
+            depth -= 1
+            if depth == 0:
+                return i
+        elif token.group() == b'(':
+            i = _string_end(data, token.start())
+        else:
+            i = data.index(b'>', i) + 1
+
+
+def _decode(head, stream):
+    """Decoded data of a stream, or None when it uses a filter other than ASCII85 and Flate."""
+    match = FILTER.search(head)
+    for name in NAME.findall(match.group(1)) if match else []:
+        if name == b'ASCII85Decode':
+            stream = base64.a85decode(stream.strip().removesuffix(b'~>'))
+        elif name == b'FlateDecode':
+            stream = zlib.decompress(stream)
+        else:
+            return None
+    return stream
+
+
+def _value_end(data, pos):
+    """Index just past the dictionary, array or indirect reference starting at data[pos]."""
+    if data.startswith(b'<<', pos):
+        return _dict_end(data, pos)
+    if data.startswith(b'[', pos):
+        return data.index(b']', pos) + 1
+    return INDIRECT.match(data, pos).end()
+
+
+def read_objects(data):
+    """Split a PDF with a classic xref table into {number: (head, stream data or None)}."""
+    startxref = data.rindex(b'startxref')
+    xref_offset = int(data[startxref + 9:].split()[0])
+    if not data.startswith(b'xref', xref_offset):
+        raise ValueError("Only classic xref tables are supported")
+
+    trailer_start = data.index(b'trailer', xref_offset)
+    lines = data[xref_offset:trailer_start].split(b'\n')
+    first, count = (int(value) for value in lines[1].split())
+    offsets = {}
+    for index, line in enumerate(lines[2:2 + count]):
+        fields = line.split()
+        if fields[2] == b'n':
+            offsets[first + index] = int(fields[0])
+
+    objects = {}
+    for number, offset in offsets.items():
+        header = OBJ_HEADER.match(data, offset)
+        start = header.end()
+        if data.startswith(b'<<', start):
+            end = _dict_end(data, start)
+            head = data[start:end]
+            stream = STREAM_KEYWORD.match(data, end)
+            if stream:
+                length = int(LENGTH.search(head).group(1))
+                objects[number] = (head, data[stream.end():stream.end() + length])
+                continue
+        else:
+            end = data.index(b'endobj', start)
+            head = data[start:end].rstrip()
+        objects[number] = (head, None)
+
+    trailer = data[trailer_start + 7:startxref]
+    return objects, trailer
+
+
+class PdfConcatenator:
+    """Append the pages of reportlab-written PDFs to one output file."""
+
+    def __init__(self, output_filename, compact=False, invariant=False):
+        self.output_filename = output_filename
+        self.compact = compact
+        self.invariant = invariant
+        self.section_bytes = {}
+        self._section = None
+        self._pending = []
+        self._tmp_filename = output_filename + ".part"
+        self._file = open(self._tmp_filename, 'wb')
+        self._digest = hashlib.md5()
+        self._offsets = [0]
+        self._shared = {}
+        self._kids = []
+        self._info = None
+        self._parsed = {}
+        self._pages_number = self._reserve()
+        self._write(b'%PDF-1.5\n' if compact else b'%PDF-1.4\n')
+        self._write(b'%\x93\x8c\x8b\x9e LEAP\n')
+
+    def _reserve(self):
+        self._offsets.append(None)
+        return len(self._offsets) - 1
+
+    def _fresh_info(self):
+        if self.invariant:
+            return self._info
+        stamp = time.strftime("D:%Y%m%d%H%M%S+00'00'", time.gmtime()).encode()
+        return INFO_DATE.sub(lambda match: b'/%s (%s)' % (match.group(1), stamp), self._info)
+
+    def _write(self, data):
+        self._file.write(data)
+        self._digest.update(data)
+        self.section_bytes[self._section] = self.section_bytes.get(self._section, 0) + len(data)
+
+    def section(self, name):
+        """Count the bytes written from now on towards section name."""
+        self._flush_objects()
+        self._section = name
+
+    def _write_object(self, number, head, stream=None):
+        if self.compact and stream is None:
+            self._pending.append((number, head))
+            if len(self._pending) >= OBJECT_STREAM_SIZE:
+                self._flush_objects()
+            return
+
+        self._offsets[number] = self._file.tell()
+        self._write(b'%d 0 obj\n' % number)
+        self._write(head)
+        if stream is not None:
+            self._write(b'\nstream\n')
+            self._write(stream)
+            self._write(b'\nendstream')
+        self._write(b'\nendobj\n')
+
+    def _flush_objects(self):
+        """Write the pending dictionaries as one compressed object stream."""
+        if not self._pending:
+            return
+        number = self._reserve()
+        header, body = [], []
+        position = 0
+        for index, (member, head) in enumerate(self._pending):
+            self._offsets[member] = (number, index)
+            header.append(b'%d %d' % (member, position))
+            body.append(head)
+            position += len(head) + 1
+        header = b' '.join(header) + b'\n'
+        data = zlib.compress(header + b'\n'.join(body) + b'\n')
+        count = len(self._pending)
+        self._pending = []
+        self._write_object(number, b'<< /Type /ObjStm /N %d /First %d /Filter /FlateDecode /Length %d >>'
+                           % (count, len(header), len(data)), data)
+
+    def append(self, filename, start=0, stop=None):
+        """Append pages start:stop (by default every page) of a PDF file in order; returns how many."""
+        if filename not in self._parsed:
+            with open(filename, 'rb') as f:
+                data = f.read()
+            profiler.count("files.read")
+            objects, trailer = read_objects(data)
+
+            root = int(re.search(rb'/Root (\d+) 0 R', trailer).group(1))
+            info = re.search(rb'/Info (\d+) 0 R', trailer)
+            if self._info is None and info:
+                self._info = objects[int(info.group(1))][0]
+
+            pages = []
+            self._collect_pages(objects, int(re.search(rb'/Pages (\d+) 0 R', objects[root][0]).group(1)), pages)
+            self._parsed[filename] = (objects, pages)
+
+        objects, pages = self._parsed[filename]
+        if start == 0 and stop is None:
+            del self._parsed[filename]
+        mapping = {}
+        for page in pages[start:stop]:
+            self._kids.append(self._copy(objects, page, mapping))
+        return len(pages[start:stop])
+
+    def release(self, filename):
+        """Forget the parsed objects of a file appended by page ranges."""
+        self._parsed.pop(filename, None)
+
+    def _collect_pages(self, objects, number, pages):
+        head = objects[number][0]
+        if PAGE_TYPE.search(head):
+            pages.append(number)
+            return
+        for kid in REF.finditer(KIDS.search(head).group(1)):
+            self._collect_pages(objects, int(kid.group(1)), pages)
+
+    def _copy(self, objects, number, mapping):
+        """Write an object and everything it references, returning its new number."""
+        if number in mapping:
+            if mapping[number] is None:
+                raise ValueError(f"Reference cycle through object {number}")
+            return mapping[number]
+        mapping[number] = None
+
+        head, stream = objects[number]
+        is_page = PAGE_TYPE.search(head) is not None
+        if is_page:
+            head = PARENT.sub(b'', head)
+        if self.compact:
+            head = self._strip_resources(objects, head, stream, is_page)
+        head = REF.sub(lambda m: b'%d 0 R' % self._copy(objects, int(m.group(1)), mapping), head)
+        if is_page:
+            head = head[:2] + b'\n/Parent %d 0 R' % self._pages_number + head[2:]
+            new_number = self._reserve()
+        else:
+            key = hashlib.sha1(head + b'\0' + (stream if stream is not None else b'')).digest()
+            if key in self._shared:
+                mapping[number] = self._shared[key]
+                return mapping[number]
+            new_number = self._shared[key] = self._reserve()
+
+        self._write_object(new_number, head, stream)
+        mapping[number] = new_number
+        return new_number
+
+    def _strip_resources(self, objects, head, stream, is_page):
+        """Cut the resources of a page or form down to the names its content uses."""
+        if is_page:
+            head = DEFAULT_ENTRIES.sub(b'', head)
+            contents = CONTENTS.search(head)
+            if contents is None:
+                return head
+            parts = [_decode(*objects[int(ref)]) for ref in INDIRECT.findall(contents.group(1))]
+            content = None if None in parts else b'\n'.join(parts)
+        elif FORM_TYPE.search(head):
+            content = _decode(head, stream)
+        else:
+            return head
+        match = RESOURCES.search(head)
+        if content is None or match is None:
+            return head
+
+        used = set(NAME.findall(content))
+        end = _dict_end(head, match.end())
+        entries = []
+        pos = SPACE.match(head, match.end() + 2).end()
+        while not head.startswith(b'>>', pos):
+            key = RESOURCE_KEY.match(head, pos)
+            pos = _value_end(head, key.end())
+            value = head[key.end():pos]
+            pos = SPACE.match(head, pos).end()
+
+            if key.group(1) == b'ProcSet':
+                continue  # obsolete since PDF 1.4
+            subdict = value
+            indirect = INDIRECT.fullmatch(value)
+            if indirect and objects[int(indirect.group(1))][1] is None:
+                subdict = objects[int(indirect.group(1))][0]
+            named = NAMED_REF.findall(subdict)
+            if not subdict.startswith(b'<<') or NAMED_REF.sub(b'', subdict[2:-2]).strip():
+                entries.append(b'/%s %s' % (key.group(1), value))  # not a plain name table
+                continue
+            kept = [b'/%s %s' % (name, ref) for name, ref in named if name in used]
+            if kept:
+                entries.append(b'/%s << %s >>' % (key.group(1), b' '.join(kept)))
+        return head[:match.start()] + b'/Resources << %s >>' % b' '.join(entries) + head[end:]
+
+    def close(self):
+        """Write the page tree, catalog, xref and trailer, then move the file into place."""
+        self.section(None)
+        kids = b' '.join(b'%d 0 R' % kid for kid in self._kids)
+        self._write_object(self._pages_number,
+                           b'<< /Count %d /Kids [ %s ] /Type /Pages >>' % (len(self._kids), kids))
+        catalog = self._reserve()
+        self._write_object(catalog, b'<< /PageMode /UseNone /Pages %d 0 R /Type /Catalog >>' % self._pages_number)
+        info = None
+        if self._info is not None:
+            info = self._reserve()
+            self._write_object(info, self._fresh_info())
+        self._flush_objects()
+
+        if self.compact:
+            self._write_xref_stream(catalog, info)
+        else:
+            self._write_xref_table(catalog, info)
+
+        self._file.close()
+        os.replace(self._tmp_filename, self.output_filename)
+        profiler.count("files.written")
+
+    def _write_xref_table(self, catalog, info):
+        file_id = self._digest.hexdigest().encode()
+        xref_offset = self._file.tell()
+        self._write(b'xref\n0 %d\n0000000000 65535 f \n' % len(self._offsets))
+        for offset in self._offsets[1:]:
+            self._write(b'%010d 00000 n \n' % offset)
+        trailer = b'trailer\n<< /ID [<%s><%s>] /Root %d 0 R /Size %d' % (file_id, file_id, catalog, len(self._offsets))
+        if info is not None:
+            trailer += b' /Info %d 0 R' % info
+        self._write(trailer + b' >>\nstartxref\n%d\n%%%%EOF\n' % xref_offset)
+
+    def _write_xref_stream(self, catalog, info):
+        """Cross-reference stream: type 1 rows give file offsets, type 2 rows object stream slots."""
+        file_id = self._digest.hexdigest().encode()
+        number = self._reserve()
+        self._offsets[number] = xref_offset = self._file.tell()
+        rows = [struct.pack('>BIH', 0, 0, 65535)]
+        for offset in self._offsets[1:]:
+            if isinstance(offset, tuple):
+                rows.append(struct.pack('>BIH', 2, *offset))
+            else:
+                rows.append(struct.pack('>BIH', 1, offset, 0))
+        data = zlib.compress(b''.join(rows))
+        head = b'<< /Type /XRef /W [ 1 4 2 ] /ID [<%s><%s>] /Root %d 0 R /Size %d' % (
+            file_id, file_id, catalog, len(self._offsets))
+        if info is not None:
+            head += b' /Info %d 0 R' % info
+        head += b' /Filter /FlateDecode /Length %d >>' % len(data)
+        self._write(b'%d 0 obj\n' % number + head + b'\nstream\n' + data + b'\nendstream\nendobj\n')
+        self._write(b'startxref\n%d\n%%%%EOF\n' % xref_offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._tmp_filename)
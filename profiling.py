@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+import cProfile
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+# Highest resident set size seen before the kernel's high-water mark was reset
+_reset_peak_mb = 0.0
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size of this process (or its finished children) in MB, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    peak = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return peak if children else max(peak, _reset_peak_mb)
+
+
+def reset_peak_rss():
+    """Peak RSS in MB since the last reset, then restart it from the current RSS; None off Linux."""
+    global _reset_peak_mb
+    try:
+        with open("/proc/self/status") as f:
+            peak = next(int(line.split()[1]) / 1024 for line in f if line.startswith("VmHWM:"))
+        with open("/proc/self/clear_refs", 'w') as f:
+            f.write("5")
+    except (OSError, StopIteration, ValueError):
+        return None
+    _reset_peak_mb = max(_reset_peak_mb, peak)
+    return peak
+
+
+class Profiler:
+    """Collect stage timings, per-puzzle statistics and counters for --profile."""
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = []
+        self.puzzles = []
+        self.counters = {}
+        self._cprofile = None
+        self._stage_peaks = []
+
+    def enable(self, cprofile=False):
+        self.enabled = True
+        if cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage of the run: wall time, CPU time, its own peak RSS and the process peak so far."""
+        if not self.enabled:
+            yield
+            return
+
+        self._peak_checkpoint()
+        self._stage_peaks.append(0.0)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            supported = self._peak_checkpoint()
+            stage_peak = self._stage_peaks.pop()
+            self.stages.append({
+                "name": name,
+                "wall_s": round(time.perf_counter() - wall, 6),
+                "cpu_s": round(time.process_time() - cpu, 6),
+                "peak_rss_mb": stage_peak if supported else None,
+                "process_peak_rss_mb": peak_rss_mb(),
+            })
+
+    def _peak_checkpoint(self):
+        # Credit the peak since the last checkpoint to every open stage, so
+        # nested stages do not hide their memory from the enclosing ones
+        peak = reset_peak_rss()
+        if peak is None:
+            return False
+        self._stage_peaks = [max(stage_peak, peak) for stage_peak in self._stage_peaks]
+        return True
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def puzzle(self, puzzle_id, stats):
+        """Record one puzzle's generation statistics and add its node counts to the totals."""
+        if not self.enabled:
+            return
+        self.puzzles.append(dict(stats, id=puzzle_id))
+        self.count("fill_grid.nodes", stats["fill_nodes"])
+        self.count("solver.nodes", stats["solver_nodes"])
+
+    def report(self):
+        return {
+            "stages": self.stages,
+            "counters": self.counters,
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_children_mb": peak_rss_mb(children=True),
+            "puzzles": self.puzzles,
+        }
+
+    def write(self, path, cprofile_path=None):
+        """Write the JSON report, and the cProfile statistics when they were collected."""
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=1)
+        if self._cprofile is not None and cprofile_path:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(cprofile_path)
+
+
+profiler = Profiler()
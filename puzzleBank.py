@@ -0,0 +1,192 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from generatePuzzle import SudokuGenerator, derive_seed
+from gridBatch import GridBatch
+from gridFactory import GridFactory
+from sudokuGrid import Grid
+from sudokuGrader import TechniqueGrader, TECHNIQUES, TRIAL
+
+BANK_FILENAME = "puzzle.bank"
+BANK_MAGIC = b"LPBK"
+BANK_VERSION = 1
+
+# magic, version, group count, record count
+HEADER = struct.Struct("<4sHHI")
+# hint count, technique, first record, record count
+GROUP = struct.Struct("<BBII")
+# puzzle, solution, hint count, technique
+RECORD = struct.Struct("<81s81sBB")
+
+# Technique numbers stored in records, in rating order
+BANK_TECHNIQUES = list(TECHNIQUES) + [TRIAL]
+
+
+def _dig_job(job):
+    """Dig and grade one bank puzzle from a solved grid."""
+    solution, n_hints, unique, dig_budget, seed = job
+    random.seed(seed)
+    generator = SudokuGenerator(n_hints, unique, dig_budget)
+    generator.grid = solution
+    generator.remove_numbers()
+    grade = TechniqueGrader().grade(generator.grid)
+    return generator.grid, solution, generator.grid.hints(), grade[1]
+
+
+def build_bank(path, count, hints_list, unique=False, dig_budget=200, seed=None, workers=1):
+    """Generate count puzzles per hint count and write them to a new bank file."""
+    if seed is None:
+        seed = random.getrandbits(32)
+    random.seed(seed)
+    solutions = GridBatch.generate(GridFactory().seed_grids, count * len(hints_list), seed)
+    jobs = [(solutions[index * count + i], n_hints, unique, dig_budget, derive_seed(seed, "bank", n_hints, i))
+            for index, n_hints in enumerate(hints_list) for i in range(count)]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_dig_job, jobs, chunksize=16))
+    else:
+        results = list(map(_dig_job, jobs))
+
+    order = {name: index for index, (name, _) in enumerate(BANK_TECHNIQUES)}
+    records = sorted(((hints, order[technique], grid, solution)
+                      for grid, solution, hints, technique in results),
+                     key=lambda record: record[:2])
+
+    groups = []
+    for index, (hints, technique, _, _) in enumerate(records):
+        if groups and groups[-1][:2] == [hints, technique]:
+            groups[-1][3] += 1
+        else:
+            groups.append([hints, technique, index, 1])
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(BANK_MAGIC, BANK_VERSION, len(groups), len(records)))
+        for group in groups:
+            f.write(GROUP.pack(*group))
+        for hints, technique, grid, solution in records:
+            f.write(RECORD.pack(grid.cells, solution.cells, hints, technique))
+    os.replace(tmp_path, path)
+
+    if os.path.exists(path + ".used"):
+        os.remove(path + ".used")
+    return len(records)
+
+
+class PuzzleBank:
+    """Read puzzles from a bank file through a memory map."""
+
+    def __init__(self, path=BANK_FILENAME):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, group_count, self.record_count = HEADER.unpack_from(self._data, 0)
+        if magic != BANK_MAGIC:
+            raise ValueError(f"{path} is not a LEAP puzzle bank")
+        if version != BANK_VERSION:
+            raise ValueError(f"Unsupported puzzle bank version {version}")
+
+        self.groups = [GROUP.unpack_from(self._data, HEADER.size + index * GROUP.size)
+                       for index in range(group_count)]
+        self._records_offset = HEADER.size + group_count * GROUP.size
+        self.techniques = BANK_TECHNIQUES
+
+        self.used = array('I', [0] * group_count)
+        if os.path.exists(path + ".used"):
+            with open(path + ".used", 'rb') as f:
+                self.used = array('I', f.read())
+            if len(self.used) != group_count:
+                raise ValueError(f"{path}.used does not match the bank")
+
+    def available(self, group_index):
+        return self.groups[group_index][3] - self.used[group_index]
+
+    def matching_groups(self, min_hints, band=None):
+        """Indexes of groups with at least min_hints hints, fewest hints first, optionally within a score band."""
+        return [index for index, (hints, technique, _, _) in enumerate(self.groups)
+                if hints >= min_hints and (band is None or band[0] <= self.techniques[technique][1] <= band[1])]
+
+    def _record(self, index):
+        grid, solution, _, technique = RECORD.unpack_from(self._data, self._records_offset + index * RECORD.size)
+        name, rating = self.techniques[technique]
+        return Grid(grid, 9), Grid(solution, 9), (rating, name)
+
+    def draw(self, count, min_hints, band=None):
+        """Take count unused puzzles as (grid, solution, grade) tuples."""
+        groups = self.matching_groups(min_hints, band)
+        if sum(self.available(index) for index in groups) < count:
+            band_text = f" graded {band[0]}-{band[1]}" if band else ""
+            raise ValueError(f"Puzzle bank has fewer than {count} unused puzzles "
+                             f"with at least {min_hints} hints{band_text}")
+
+        drawn = []
+        for index in groups:
+            start = self.groups[index][2]
+            while len(drawn) < count and self.available(index):
+                drawn.append(self._record(start + self.used[index]))
+                self.used[index] += 1
+        return drawn
+
+    def save_usage(self):
+        """Persist the usage cursors so later books draw different puzzles."""
+        tmp_path = self.path + ".used.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.used.tobytes())
+        os.replace(tmp_path, self.path + ".used")
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and inspect LEAP puzzle banks.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Generate a new puzzle bank")
+    build.add_argument("path", nargs="?", default=BANK_FILENAME, help="Bank file to write")
+    build.add_argument("-c", "--count", type=int, default=1000,
+                       help="Number of puzzles per hint count")
+    build.add_argument("--hints", type=int, nargs="+", default=[40, 36, 27, 18],
+                       help="Hint counts to generate")
+    build.add_argument("-u", "--unique", action="store_true", default=False,
+                       help="Only remove numbers that keep the solution unique")
+    build.add_argument("--dig-budget", type=int, default=200,
+                       help="Maximum removal attempts per puzzle in unique mode")
+    build.add_argument("-s", "--seed", type=int, default=None, help="Master seed")
+    build.add_argument("-w", "--workers", type=int, default=1,
+                       help="Number of processes used to generate puzzles")
+
+    info = subparsers.add_parser("info", help="Show the groups of a puzzle bank")
+    info.add_argument("path", nargs="?", default=BANK_FILENAME, help="Bank file to read")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if args.count < 1 or any(hints < 18 for hints in args.hints):
+            parser.error("count must be positive and every hint count at least 18")
+        total = build_bank(args.path, args.count, args.hints, args.unique, args.dig_budget,
+                           args.seed, args.workers)
+        print(f"Wrote {total} puzzles to {args.path}")
+    else:
+        with PuzzleBank(args.path) as bank:
+            print(f"{bank.record_count} puzzles in {len(bank.groups)} groups")
+            for index, (hints, technique, _, count) in enumerate(bank.groups):
+                name, rating = bank.techniques[technique]
+                print(f"  {hints:>2} hints  {name:<18} {rating:>4}  {bank.available(index):>6}/{count} unused")
+
+
+if __name__ == "__main__":
+    main()
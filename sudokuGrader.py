@@ -0,0 +1,264 @@
+from itertools import combinations
+from sudokuGrid import Grid, DECODE, UNITS, PEERS
+from sudokuSolver import ALL_DIGITS
+
+PEER_SETS = [set(peers) for peers in PEERS]
+
+# (box cells in the line, rest of the box, rest of the line) for every box/line crossing
+INTERSECTIONS = []
+for _box in UNITS[18:]:
+    for _line in UNITS[:18]:
+        _common = [i for i in _box if i in _line]
+        if _common:
+            INTERSECTIONS.append((_common, [i for i in _box if i not in _common],
+                                  [i for i in _line if i not in _common]))
+
+# Ratings follow the Sudoku Explainer scale where it has an equivalent.
+TECHNIQUES = (
+    ("Hidden Single", 1.5),
+    ("Naked Single", 2.3),
+    ("Locked Candidates", 2.6),
+    ("Naked Pair", 3.0),
+    ("X-Wing", 3.2),
+    ("Hidden Pair", 3.4),
+    ("Naked Triple", 3.6),
+    ("Hidden Triple", 4.0),
+    ("XY-Wing", 4.2),
+    ("Simple Colouring", 4.5),
+)
+TRIAL = ("Trial and Error", 10.0)
+
+# Score range each book mode is filled from when grading is enabled
+DIFFICULTY_BANDS = {
+    'E': (0.0, 1.5),
+    'M': (2.3, 3.0),
+    'A': (3.2, 4.2),
+    'G': (4.5, TRIAL[1]),
+}
+
+
+def _digits(mask):
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        yield bit
+
+
+class TechniqueGrader:
+    """Rate a puzzle by the human techniques needed to solve it."""
+
+    def __init__(self):
+        self._ladder = [(name, rating, getattr(self, "_" + name.lower().replace(" ", "_").replace("-", "_")))
+                        for name, rating in TECHNIQUES]
+
+    def _load(self, grid):
+        values = [0] * 81
+        candidates = [ALL_DIGITS] * 81
+        for i, num in enumerate(Grid.coerce(grid).cells):
+            if not num:
+                continue
+            if num > 9:
+                raise ValueError(f"Invalid value {DECODE[num]!r} at R{i // 9 + 1}C{i % 9 + 1}")
+            if not candidates[i] & (1 << (num - 1)):
+                return None
+            self._place(values, candidates, i, 1 << (num - 1))
+        return values, candidates
+
+    def _place(self, values, candidates, i, bit):
+        values[i] = bit.bit_length()
+        candidates[i] = 0
+        mask = ~bit
+        for peer in PEERS[i]:
+            candidates[peer] &= mask
+
+    def _eliminate(self, candidates, cells, mask):
+        """Remove mask from the given cells, returning whether anything changed."""
+        changed = False
+        for i in cells:
+            if candidates[i] & mask:
+                candidates[i] &= ~mask
+                changed = True
+        return changed
+
+    def _hidden_single(self, values, candidates):
+        for unit in UNITS:
+            once = twice = 0
+            for i in unit:
+                twice |= once & candidates[i]
+                once |= candidates[i]
+            hidden = once & ~twice
+            if hidden:
+                bit = hidden & -hidden
+                for i in unit:
+                    if candidates[i] & bit:
+                        self._place(values, candidates, i, bit)
+                        return True
+        return False
+
+    def _naked_single(self, values, candidates):
+        for i in range(81):
+            mask = candidates[i]
+            if mask and not mask & (mask - 1):
+                self._place(values, candidates, i, mask)
+                return True
+        return False
+
+    def _locked_candidates(self, values, candidates):
+        for common, box_rest, line_rest in INTERSECTIONS:
+            inside = 0
+            for i in common:
+                inside |= candidates[i]
+            if not inside:
+                continue
+            box_mask = line_mask = 0
+            for i in box_rest:
+                box_mask |= candidates[i]
+            for i in line_rest:
+                line_mask |= candidates[i]
+            # Pointing: confined to the line within the box; claiming: the reverse
+            if self._eliminate(candidates, line_rest, inside & ~box_mask & line_mask):
+                return True
+            if self._eliminate(candidates, box_rest, inside & ~line_mask & box_mask):
+                return True
+        return False
+
+    def _naked_subset(self, candidates, size):
+        for unit in UNITS:
+            cells = [i for i in unit if 2 <= candidates[i].bit_count() <= size]
+            for subset in combinations(cells, size):
+                mask = 0
+                for i in subset:
+                    mask |= candidates[i]
+                if mask.bit_count() == size:
+                    others = [i for i in unit if i not in subset]
+                    if self._eliminate(candidates, others, mask):
+                        return True
+        return False
+
+    def _hidden_subset(self, candidates, size):
+        for unit in UNITS:
+            places = {}
+            for position, i in enumerate(unit):
+                for bit in _digits(candidates[i]):
+                    places[bit] = places.get(bit, 0) | (1 << position)
+            digits = [bit for bit, where in places.items() if 2 <= where.bit_count() <= size]
+            for subset in combinations(digits, size):
+                where = mask = 0
+                for bit in subset:
+                    where |= places[bit]
+                    mask |= bit
+                if where.bit_count() == size:
+                    cells = [i for position, i in enumerate(unit) if where >> position & 1]
+                    if self._eliminate(candidates, cells, ALL_DIGITS & ~mask):
+                        return True
+        return False
+
+    def _naked_pair(self, values, candidates):
+        return self._naked_subset(candidates, 2)
+
+    def _hidden_pair(self, values, candidates):
+        return self._hidden_subset(candidates, 2)
+
+    def _naked_triple(self, values, candidates):
+        return self._naked_subset(candidates, 3)
+
+    def _hidden_triple(self, values, candidates):
+        return self._hidden_subset(candidates, 3)
+
+    def _x_wing(self, values, candidates):
+        for bit in (1 << d for d in range(9)):
+            for base, cover in ((UNITS[:9], UNITS[9:18]), (UNITS[9:18], UNITS[:9])):
+                pairs = {}
+                for index, unit in enumerate(base):
+                    where = 0
+                    for position, i in enumerate(unit):
+                        if candidates[i] & bit:
+                            where |= 1 << position
+                    if where.bit_count() == 2:
+                        pairs.setdefault(where, []).append(index)
+                for where, lines in pairs.items():
+                    if len(lines) < 2:
+                        continue
+                    first, second = lines[:2]
+                    for position in range(9):
+                        if where >> position & 1:
+                            others = [i for index, i in enumerate(cover[position]) if index not in (first, second)]
+                            if self._eliminate(candidates, others, bit):
+                                return True
+        return False
+
+    def _xy_wing(self, values, candidates):
+        bivalue = [i for i in range(81) if candidates[i].bit_count() == 2]
+        for pivot in bivalue:
+            pivot_mask = candidates[pivot]
+            wings = [i for i in PEERS[pivot]
+                     if candidates[i].bit_count() == 2 and (candidates[i] & pivot_mask).bit_count() == 1]
+            for first, second in combinations(wings, 2):
+                shared = candidates[first] & candidates[second]
+                if shared.bit_count() != 1 or shared & pivot_mask \
+                        or (candidates[first] | candidates[second]) & pivot_mask != pivot_mask:
+                    continue
+                targets = PEER_SETS[first] & PEER_SETS[second]
+                targets.discard(pivot)
+                if self._eliminate(candidates, targets, shared):
+                    return True
+        return False
+
+    def _simple_colouring(self, values, candidates):
+        for bit in (1 << d for d in range(9)):
+            links = {}
+            for unit in UNITS:
+                cells = [i for i in unit if candidates[i] & bit]
+                if len(cells) == 2:
+                    first, second = cells
+                    links.setdefault(first, set()).add(second)
+                    links.setdefault(second, set()).add(first)
+
+            colour = {}
+            for start in links:
+                if start in colour:
+                    continue
+                colour[start] = 0
+                chain, stack = [start], [start]
+                while stack:
+                    cell = stack.pop()
+                    for other in links[cell]:
+                        if other not in colour:
+                            colour[other] = 1 - colour[cell]
+                            chain.append(other)
+                            stack.append(other)
+                if len(chain) < 3:
+                    continue
+
+                groups = ([i for i in chain if colour[i] == 0], [i for i in chain if colour[i] == 1])
+                # Colour wrap: two cells of one colour see each other, so that colour is false
+                for group in groups:
+                    if any(PEER_SETS[a] & set(group) for a in group):
+                        return self._eliminate(candidates, group, bit)
+                # Colour trap: a cell that sees both colours cannot hold the digit
+                chain_cells = set(chain)
+                seen = [set().union(*(PEER_SETS[i] for i in group)) for group in groups]
+                targets = [i for i in seen[0] & seen[1] if i not in chain_cells and candidates[i] & bit]
+                if self._eliminate(candidates, targets, bit):
+                    return True
+        return False
+
+    def grade(self, grid):
+        """Return (score, hardest technique) for the grid, or None if it is invalid."""
+        state = self._load(grid)
+        if state is None:
+            return None
+        values, candidates = state
+
+        hardest, score = None, 0.0
+        while not all(values):
+            if any(not values[i] and not candidates[i] for i in range(81)):
+                return None
+            for name, rating, step in self._ladder:
+                if step(values, candidates):
+                    if rating > score:
+                        hardest, score = name, rating
+                    break
+            else:
+                return TRIAL[1], TRIAL[0]
+        return score, hardest
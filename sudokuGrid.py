@@ -0,0 +1,101 @@
+from functools import lru_cache
+from math import isqrt
+
+# Placeholder letter k is stored as PLACEHOLDER_BASE + k, above every digit
+PLACEHOLDER_BASE = 97
+
+# Cell code -> value as grids have always shown it: ints for digits, letters for placeholders
+DECODE = tuple(code if code < PLACEHOLDER_BASE else chr(code) for code in range(256))
+
+
+@lru_cache(maxsize=None)
+def index_tables(size=9):
+    """Row, column and box of every cell, the cells of every unit, and every cell's peers."""
+    box = isqrt(size)
+    cells = range(size * size)
+    rows = tuple(i // size for i in cells)
+    cols = tuple(i % size for i in cells)
+    boxes = tuple((i // (size * box)) * box + (i % size) // box for i in cells)
+    units = tuple(
+        [tuple(r * size + c for c in range(size)) for r in range(size)] +
+        [tuple(r * size + c for r in range(size)) for c in range(size)] +
+        [tuple(i for i in cells if boxes[i] == b) for b in range(size)]
+    )
+    peers = tuple(tuple(sorted({j for unit in units if i in unit for j in unit} - {i})) for i in cells)
+    return rows, cols, boxes, units, peers
+
+
+CELL_ROW, CELL_COL, CELL_BOX, UNITS, PEERS = index_tables(9)
+
+
+class Grid:
+    """Immutable square grid stored as one byte per cell in row-major order; indexes like nested lists."""
+
+    __slots__ = ("cells", "size")
+
+    def __init__(self, cells, size=None):
+        self.cells = cells if type(cells) is bytes else bytes(cells)
+        self.size = size or isqrt(len(self.cells))
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a grid from nested lists of ints and placeholder letters."""
+        return cls(bytes(value if isinstance(value, int) else ord(value) for row in rows for value in row),
+                   len(rows))
+
+    @classmethod
+    def coerce(cls, grid):
+        """Return grid itself if it is a Grid, else a Grid built from its rows."""
+        return grid if isinstance(grid, cls) else cls.from_rows(grid)
+
+    def to_rows(self):
+        """Nested lists of ints and placeholder letters."""
+        size = self.size
+        return [[DECODE[code] for code in self.cells[row * size:(row + 1) * size]] for row in range(size)]
+
+    def mutable(self):
+        return bytearray(self.cells)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, row):
+        size = self.size
+        if row < 0:
+            row += size
+        if not 0 <= row < size:
+            raise IndexError("grid row out of range")
+        return tuple(DECODE[code] for code in self.cells[row * size:(row + 1) * size])
+
+    def __iter__(self):
+        return (self[row] for row in range(self.size))
+
+    def __bytes__(self):
+        return self.cells
+
+    def __eq__(self, other):
+        return isinstance(other, Grid) and self.cells == other.cells
+
+    def __hash__(self):
+        return hash(self.cells)
+
+    def __repr__(self):
+        return f"Grid({self.cells!r})"
+
+    def value(self, index):
+        return DECODE[self.cells[index]]
+
+    def hints(self):
+        """Number of non-blank cells."""
+        return len(self.cells) - self.cells.count(0)
+
+    def filled(self):
+        """(index, value) for every non-blank cell in row-major order."""
+        return [(index, DECODE[code]) for index, code in enumerate(self.cells) if code]
+
+    def translate(self, mapping):
+        """New grid with every code in mapping replaced by its value."""
+        table = bytearray(range(256))
+        for old, new in mapping.items():
+            table[old] = new
+        return Grid(self.cells.translate(table), self.size)
@@ -0,0 +1,143 @@
+from sudokuGrid import Grid, DECODE, CELL_ROW, CELL_COL, CELL_BOX, UNITS
+
+ALL_DIGITS = 0x1FF
+
+
+class BitmaskSolver:
+    """Sudoku solver built on row/column/box candidate bitmasks."""
+
+    nodes = 0
+
+    def _load(self, grid):
+        cells = Grid.coerce(grid).cells
+        values = [0] * 81
+        rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+
+        for i, num in enumerate(cells):
+            if not num:
+                continue
+            r, c, b = CELL_ROW[i], CELL_COL[i], CELL_BOX[i]
+            if num > 9:
+                raise ValueError(f"Invalid value {DECODE[num]!r} at R{r+1}C{c+1}")
+
+            bit = 1 << (num - 1)
+            if (rows[r] | cols[c] | boxes[b]) & bit:
+                return None
+            values[i] = num
+            rows[r] |= bit
+            cols[c] |= bit
+            boxes[b] |= bit
+
+        return values, rows, cols, boxes
+
+    def _propagate(self, state):
+        """Place naked and hidden singles until nothing changes."""
+        values, rows, cols, boxes = state
+
+        progress = True
+        while progress:
+            progress = False
+
+            for i in range(81):
+                if values[i]:
+                    continue
+                r, c, b = CELL_ROW[i], CELL_COL[i], CELL_BOX[i]
+                candidates = ALL_DIGITS & ~(rows[r] | cols[c] | boxes[b])
+                if not candidates:
+                    return False
+                if not candidates & (candidates - 1):
+                    values[i] = candidates.bit_length()
+                    rows[r] |= candidates
+                    cols[c] |= candidates
+                    boxes[b] |= candidates
+                    progress = True
+
+            if progress:
+                continue
+
+            for unit in UNITS:
+                once = twice = placed = 0
+                for i in unit:
+                    if values[i]:
+                        placed |= 1 << (values[i] - 1)
+                    else:
+                        candidates = ALL_DIGITS & ~(rows[CELL_ROW[i]] | cols[CELL_COL[i]] | boxes[CELL_BOX[i]])
+                        twice |= once & candidates
+                        once |= candidates
+
+                if (once | placed) != ALL_DIGITS:
+                    return False
+
+                hidden = once & ~twice & ~placed
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for i in unit:
+                        if values[i]:
+                            continue
+                        r, c, b = CELL_ROW[i], CELL_COL[i], CELL_BOX[i]
+                        if ALL_DIGITS & ~(rows[r] | cols[c] | boxes[b]) & bit:
+                            values[i] = bit.bit_length()
+                            rows[r] |= bit
+                            cols[c] |= bit
+                            boxes[b] |= bit
+                            progress = True
+                            break
+                    else:
+                        return False
+
+        return True
+
+    def _search(self, state, limit, solutions):
+        self.nodes += 1
+        if not self._propagate(state):
+            return 0
+
+        values, rows, cols, boxes = state
+        best, best_candidates, best_count = -1, 0, 10
+        for i in range(81):
+            if values[i]:
+                continue
+            candidates = ALL_DIGITS & ~(rows[CELL_ROW[i]] | cols[CELL_COL[i]] | boxes[CELL_BOX[i]])
+            count = candidates.bit_count()
+            if count < best_count:
+                best, best_candidates, best_count = i, candidates, count
+                if count == 2:
+                    break
+
+        if best < 0:
+            solutions.append(values)
+            return 1
+
+        r, c, b = CELL_ROW[best], CELL_COL[best], CELL_BOX[best]
+        found = 0
+        while best_candidates and found < limit:
+            bit = best_candidates & -best_candidates
+            best_candidates ^= bit
+
+            child = (values[:], rows[:], cols[:], boxes[:])
+            child[0][best] = bit.bit_length()
+            child[1][r] |= bit
+            child[2][c] |= bit
+            child[3][b] |= bit
+            found += self._search(child, limit - found, solutions)
+
+        return found
+
+    def solve(self, grid):
+        """Return the solved Grid of a grid, or None if it has no solution."""
+        state = self._load(grid)
+        if state is None:
+            return None
+
+        solutions = []
+        if not self._search(state, 1, solutions):
+            return None
+        return Grid(bytes(solutions[0]), 9)
+
+    def count_solutions(self, grid, limit=2):
+        """Count the solutions of the grid, stopping once limit is reached."""
+        state = self._load(grid)
+        if state is None:
+            return 0
+        return self._search(state, limit, [])
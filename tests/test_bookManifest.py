@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bookManifest import load_manifest
+from verifyChain import verify_chain
+
+# A puzzles/ folder written by the original SVG-based generator: three Easy
+# and two Medium puzzles with their solutions, coordinates and placeholders
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "baseline_puzzles")
+
+
+class LoadManifestTest(unittest.TestCase):
+    def test_reads_baseline_folder(self):
+        manifest = load_manifest(BASELINE_DIR)
+
+        self.assertEqual([record.puzzle_id for record in manifest], ["E1", "E2", "E3", "M1", "M2"])
+        self.assertEqual([record.global_number for record in manifest], [1, 2, 3, 4, 5])
+        self.assertEqual(manifest.get(2).links, [('a', 1, 1, 2), ('b', 4, 9, 3), ('c', 4, 1, 8)])
+        self.assertEqual(manifest.get(4).links, [])
+        for record in manifest:
+            self.assertEqual(record.grid.size, 9)
+            self.assertNotIn(0, record.solution.cells)
+
+    def test_baseline_chain_verifies(self):
+        self.assertEqual(verify_chain(load_manifest(BASELINE_DIR)), 5)
+
+    def test_empty_folder_is_an_error(self):
+        with tempfile.TemporaryDirectory() as puzzle_dir:
+            with self.assertRaises(ValueError):
+                load_manifest(puzzle_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bookManifest import BookManifest, PuzzleRecord, load_manifest
+from chainFile import read_chain, write_chain
+from exactCover import ExactCoverSudoku
+from sudokuGrid import Grid, PLACEHOLDER_BASE
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "baseline_puzzles")
+
+
+def sixteen_by_sixteen_manifest():
+    rng = random.Random(5)
+    engine = ExactCoverSudoku(4)
+    manifest = BookManifest()
+    for number in range(1, 3):
+        solution = engine.fill(rng)
+        cells = solution.mutable()
+        for index in rng.sample(range(256), 120):
+            cells[index] = 0
+        links = []
+        if number > 1:
+            # Placeholders a and b take the values at R1C2 and R16C16 of the previous solution
+            previous = manifest.get(number - 1).solution
+            for letter_index, (row, col) in enumerate([(1, 2), (16, 16)]):
+                value = previous.value((row - 1) * 16 + col - 1)
+                cells[cells.index(value)] = PLACEHOLDER_BASE + letter_index
+                links.append((chr(PLACEHOLDER_BASE + letter_index), row, col, value))
+        manifest.add(PuzzleRecord(f"E{number}", "E", number, Grid(cells, 16), solution, links))
+    return manifest
+
+
+class ChainFileTest(unittest.TestCase):
+    def assert_round_trip(self, manifest):
+        with tempfile.TemporaryDirectory() as chain_dir:
+            path = os.path.join(chain_dir, "chain.leap")
+            write_chain(path, manifest)
+            loaded = read_chain(path)
+
+        self.assertEqual(len(loaded), len(manifest))
+        for original, record in zip(manifest, loaded):
+            self.assertEqual(record.puzzle_id, original.puzzle_id)
+            self.assertEqual(record.mode, original.mode)
+            self.assertEqual(record.global_number, original.global_number)
+            self.assertEqual(record.grid, original.grid)
+            self.assertEqual(record.solution, original.solution)
+            self.assertEqual(record.grid.size, original.grid.size)
+            self.assertEqual(record.links, original.links)
+
+    def test_round_trip_9x9(self):
+        self.assert_round_trip(load_manifest(BASELINE_DIR))
+
+    def test_round_trip_16x16(self):
+        manifest = sixteen_by_sixteen_manifest()
+        self.assertEqual(len(manifest.get(2).links), 2)
+        self.assert_round_trip(manifest)
+
+
+if __name__ == "__main__":
+    unittest.main()
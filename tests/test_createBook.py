@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from buildCache import BuildCache
+from createBook import SudokuBookCreator
+
+
+class TemplateCacheTest(unittest.TestCase):
+    def test_templates_only_depend_on_their_own_background(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            backgrounds = {'cover': os.path.join(work_dir, "cover.png"),
+                           'puzzle': os.path.join(work_dir, "puzzle.png")}
+            Image.new("RGB", (8, 8), "white").save(backgrounds['cover'])
+            Image.new("RGB", (8, 8), "white").save(backgrounds['puzzle'])
+            cache = BuildCache(os.path.join(work_dir, "templates"))
+
+            def cover_template():
+                creator = SudokuBookCreator(os.path.join(work_dir, "book.pdf"), background_images=backgrounds,
+                                            invariant=True, template_cache=cache)
+                return creator.template(None, ('cover', None))
+
+            first = cover_template()
+            Image.new("RGB", (8, 8), "black").save(backgrounds['puzzle'])
+            self.assertEqual(cover_template(), first)
+            self.assertEqual(cache.hits.get("templates"), 1)
+
+            Image.new("RGB", (8, 8), "black").save(backgrounds['cover'])
+            self.assertNotEqual(cover_template(), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from pdfConcat import PdfConcatenator
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # only needed to check the output with a strict reader
+    PdfReader = None
+
+BACKGROUND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Assets", "Index.png")
+
+
+def write_part(path, labels, compact):
+    """Write one reportlab PDF with a page per label, each drawing the same background image."""
+    canvas_obj = canvas.Canvas(path, pagesize=A4, invariant=True, pageCompression=1 if compact else None)
+    for label in labels:
+        canvas_obj.drawImage(BACKGROUND, 0, 0, 100, 100)
+        canvas_obj.setFont("Helvetica", 24)
+        canvas_obj.drawString(100, 400, label)
+        canvas_obj.showPage()
+    canvas_obj.save()
+
+
+@unittest.skipIf(PdfReader is None, "pypdf is not installed")
+class PdfConcatenatorTest(unittest.TestCase):
+    def concatenate(self, compact):
+        with tempfile.TemporaryDirectory() as work_dir:
+            first = os.path.join(work_dir, "first.pdf")
+            second = os.path.join(work_dir, "second.pdf")
+            write_part(first, ["one", "two"], compact)
+            write_part(second, ["three", "four"], compact)
+
+            output = os.path.join(work_dir, "book.pdf")
+            with PdfConcatenator(output, compact) as concatenator:
+                concatenator.section("front")
+                self.assertEqual(concatenator.append(first), 2)
+                concatenator.section("back")
+                self.assertEqual(concatenator.append(second, 1, 2), 1)
+                self.assertEqual(concatenator.append(second, 0, 1), 1)
+                concatenator.release(second)
+
+            reader = PdfReader(output, strict=True)
+            texts = [page.extract_text().strip() for page in reader.pages]
+            # The image every part draws is written once and shared
+            images = {reference.idnum for page in reader.pages
+                      for reference in page["/Resources"].raw_get("/XObject").values()}
+            return texts, images, concatenator.section_bytes, os.path.getsize(output)
+
+    def test_plain(self):
+        texts, images, _, _ = self.concatenate(compact=False)
+        self.assertEqual(texts, ["one", "two", "four", "three"])
+        self.assertEqual(len(images), 1)
+
+    def test_compact(self):
+        texts, images, section_bytes, size = self.concatenate(compact=True)
+        self.assertEqual(texts, ["one", "two", "four", "three"])
+        self.assertEqual(len(images), 1)
+        self.assertEqual(sum(section_bytes.values()), size)
+        self.assertGreater(section_bytes["front"], section_bytes["back"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bookManifest import load_manifest
+from exactCover import ExactCoverSudoku
+from sudokuGrid import Grid
+from sudokuSolver import BitmaskSolver
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "baseline_puzzles")
+
+
+class SolverTest(unittest.TestCase):
+    def test_solvers_return_a_grid(self):
+        grid = load_manifest(BASELINE_DIR).get(4).grid
+        for solver in (BitmaskSolver(), ExactCoverSudoku(3)):
+            solution = solver.solve(grid)
+            self.assertIsInstance(solution, Grid)
+            self.assertNotIn(0, solution.cells)
+            for given, value in zip(grid.cells, solution.cells):
+                self.assertIn(given, (0, value))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from math import isqrt
+from chainFile import CHAIN_FILENAME, read_chain
+from sudokuGrid import Grid, DECODE, PLACEHOLDER_BASE, index_tables
+from sudokuSolver import BitmaskSolver
+from exactCover import ExactCoverSudoku
+
+
+def _count_job(cells):
+    """Count up to two solutions of one substituted puzzle in a worker process."""
+    grid = Grid(cells)
+    solver = BitmaskSolver() if grid.size == 9 else ExactCoverSudoku(isqrt(grid.size))
+    return solver.count_solutions(grid)
+
+
+def _cell_name(index, size):
+    return f"R{index // size + 1}C{index % size + 1}"
+
+
+def substitute(record, previous):
+    """Return the record's grid with every placeholder replaced from the previous solution, or raise ValueError."""
+    grid, size = record.grid, record.grid.size
+    if record.links and previous is None:
+        raise ValueError(f"{record.puzzle_id} has placeholder links but no previous puzzle in its chain")
+
+    mapping = {}
+    for letter, row, col, value in record.links:
+        code = ord(letter)
+        if code not in grid.cells:
+            raise ValueError(f"{record.puzzle_id}: placeholder {letter} is linked but not in the grid")
+        actual = previous.solution.value((row - 1) * size + col - 1)
+        if actual != value:
+            raise ValueError(f"{record.puzzle_id}: placeholder {letter} points at R{row}C{col} of "
+                             f"{previous.puzzle_id}'s solution, which holds {actual}, not {value}")
+        mapping[code] = actual
+    grid = grid.translate(mapping)
+
+    solution = record.solution.cells
+    for index, code in enumerate(grid.cells):
+        if code >= PLACEHOLDER_BASE:
+            raise ValueError(f"{record.puzzle_id}: placeholder {DECODE[code]} at "
+                             f"{_cell_name(index, size)} has no link")
+        if code and code != solution[index]:
+            raise ValueError(f"{record.puzzle_id}: given {code} at {_cell_name(index, size)} "
+                             f"contradicts the stored solution's {solution[index]}")
+    return grid
+
+
+def check_solution(record):
+    """Raise ValueError unless the record's solution is a complete valid grid."""
+    size = record.solution.size
+    digits = bytes(range(1, size + 1))
+    cells = record.solution.cells
+    for unit in index_tables(size)[3]:
+        if bytes(sorted(cells[i] for i in unit)) != digits:
+            raise ValueError(f"{record.puzzle_id}: stored solution is not a valid complete grid")
+
+
+def substitute_chain(manifest):
+    """Check every link and stored solution in book order; returns the substituted Grids."""
+    substituted = []
+    previous = None
+    for record in manifest:
+        if previous is not None and previous.mode != record.mode:
+            previous = None
+        check_solution(record)
+        substituted.append(substitute(record, previous))
+        previous = record
+    return substituted
+
+
+def find_not_unique(manifest, substituted, workers=1):
+    """Ids of the puzzles whose substituted Grid has more than one solution, solved across workers processes."""
+    cells = [grid.cells for grid in substituted]
+    if workers > 1 and len(cells) > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        counts = executor.map(_count_job, cells, chunksize=max(len(cells) // (workers * 4), 1))
+    else:
+        executor = None
+        counts = map(_count_job, cells)
+
+    try:
+        not_unique = []
+        for record, count in zip(manifest, counts):
+            if count == 0:
+                raise ValueError(f"{record.puzzle_id} has no solution once its placeholders are filled in")
+            if count > 1:
+                not_unique.append(record.puzzle_id)
+        return not_unique
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def verify_chain(manifest, unique=False, workers=1):
+    """Replay the chain in book order, also proving every puzzle unique when unique; returns how many were verified."""
+    substituted = substitute_chain(manifest)
+    if unique:
+        not_unique = find_not_unique(manifest, substituted, workers)
+        if not_unique:
+            raise ValueError(f"{not_unique[0]} is not unique: it has more than one solution "
+                             f"once its placeholders are filled in")
+    return len(substituted)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Check that a LEAP puzzle chain can be solved in order.")
+    parser.add_argument("path", nargs="?", default=os.path.join("puzzles", CHAIN_FILENAME),
+                        help="Chain file to verify")
+    parser.add_argument("-u", "--unique", action="store_true", default=False,
+                        help="Require every puzzle to have exactly one solution")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of processes used to solve puzzles with --unique")
+    args = parser.parse_args(argv)
+    if args.workers > 1 and not args.unique:
+        parser.error("--workers only applies with --unique, since only uniqueness checks solve puzzles")
+
+    start = time.perf_counter()
+    manifest = read_chain(args.path)
+    try:
+        substituted = substitute_chain(manifest)
+        not_unique = find_not_unique(manifest, substituted, args.workers) if args.unique else []
+    except ValueError as error:
+        print(f"Broken chain: {error}")
+        return 1
+
+    print(f"Verified {len(substituted)} puzzles in {time.perf_counter() - start:.2f}s")
+    if not_unique:
+        print(f"Not unique: {', '.join(not_unique)} have more than one solution once their placeholders "
+              f"are filled in")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())